@@ -0,0 +1,78 @@
+import argparse
+
+import pandas as pd
+
+from prediction_engine import FEATURES, PredictionEngine
+
+
+# Batch scoring: stream a CSV of properties in chunks, one model.predict per chunk.
+
+# Column names accepted in the input file for each model feature
+FEATURE_COLUMNS = {
+    "bedrooms": ["bedrooms", "number of bedrooms"],
+    "bathrooms": ["bathrooms", "number of bathrooms"],
+    "livingarea": ["livingarea", "living_area", "living area"],
+    "condition": ["condition", "condition of the house"],
+    "numberofschools": ["numberofschools", "schools", "Number of schools nearby"],
+}
+ZIP_COLUMNS = ["zip_code", "zip", "zipcode", "ZIP Code"]
+
+DEFAULT_CHUNKSIZE = 50000
+
+
+def resolve_columns(columns):
+    lowered = {c.lower().strip(): c for c in columns}
+    resolved = {}
+    for feature in FEATURES:
+        aliases = FEATURE_COLUMNS[feature]
+        for alias in aliases:
+            if alias.lower() in lowered:
+                resolved[feature] = lowered[alias.lower()]
+                break
+        else:
+            raise ValueError(f"Input is missing a column for '{feature}' (accepted: {aliases})")
+    zip_column = next((lowered[z.lower()] for z in ZIP_COLUMNS if z.lower() in lowered), None)
+    return resolved, zip_column
+
+
+def score_chunk(engine, chunk, columns, zip_column):
+    X = chunk[[columns[f] for f in FEATURES]].to_numpy(dtype="float64")
+    zip_codes = chunk[zip_column].to_numpy() if zip_column is not None else None
+    out = chunk.copy()
+    for key, values in engine.score(X, zip_codes).items():
+        out[key] = values
+    return out
+
+
+# Score src (path or file object) into dst, appending one chunk at a time
+def predict_csv(engine, src, dst, chunksize=DEFAULT_CHUNKSIZE):
+    header = pd.read_csv(src, nrows=0)
+    if hasattr(src, "seek"):
+        src.seek(0)
+    columns, zip_column = resolve_columns(header.columns)
+    dtype = {zip_column: str} if zip_column else None
+
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(src, chunksize=chunksize, dtype=dtype)):
+        scored = score_chunk(engine, chunk, columns, zip_column)
+        scored.to_csv(dst, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        rows += len(scored)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV of properties in batch.")
+    parser.add_argument("input", help="CSV with bedrooms, bathrooms, livingarea, condition, numberofschools and zip_code")
+    parser.add_argument("output", help="Where to write the scored CSV")
+    parser.add_argument("--model", help="Model file (.pkl or exported .npz); defaults to model.npz if it is up to date, else model.pkl")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--no-geocoder", action="store_true", help="Only use the offline ZIP index")
+    args = parser.parse_args()
+
+    engine = PredictionEngine(args.model, use_geocoder=not args.no_geocoder)
+    rows = predict_csv(engine, args.input, args.output, args.chunksize)
+    print(f"Scored {rows} properties into {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+
+# Latency / throughput benchmarks for each stage of the prediction flow.
+#
+#   python benchmark.py                          # run, write benchmark_results.json
+#   python benchmark.py --save-baseline          # also store the run as the baseline
+#   python benchmark.py --baseline benchmark_baseline.json   # compare, exit 1 on regressions
+#
+# Geocoding runs against fake_geocoder.py on localhost with a throwaway cache,
+# so results do not depend on (or hit) the public Nominatim API.
+
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+PREDICT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+HISTORY_SIZES = [10, 100, 1000]
+
+
+def summarize(samples, rows=1):
+    samples = np.asarray(samples)
+    return {
+        "runs": len(samples),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p95_ms": float(np.percentile(samples, 95) * 1000),
+        "p99_ms": float(np.percentile(samples, 99) * 1000),
+        "mean_ms": float(samples.mean() * 1000),
+        "rows_per_sec": float(rows / np.median(samples)) if np.median(samples) > 0 else None,
+    }
+
+
+# Time fn() `repeat` times, then run it once more under tracemalloc for peak memory
+def measure(fn, repeat, rows=1):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = summarize(samples, rows)
+    result["peak_memory_kb"] = peak / 1024
+    return result
+
+
+def bench_zip_validation(repeat):
+    from prediction_engine import parse_zips, validate_zip
+    zips = [f"{z:05d}" for z in np.random.default_rng(0).integers(501, 99950, 1000)]
+    return {
+        "validate_zip": measure(lambda: validate_zip("90210"), repeat),
+        "parse_zips_1000": measure(lambda: parse_zips(zips), max(10, repeat // 10), rows=len(zips)),
+    }
+
+
+def bench_geocoding(repeat):
+    from fake_geocoder import make_fake_geocoder
+    server = make_fake_geocoder(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    import geocoding
+    from geocode_cache import GeocodeCache, set_geocode_cache
+    from geocoding_client import GeocodingClient, set_geocoding_client
+    set_geocode_cache(GeocodeCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite3")))
+    set_geocoding_client(GeocodingClient(
+        domain=f"127.0.0.1:{server.server_address[1]}", scheme="http", rate=10000, max_concurrency=8
+    ))
+
+    # fresh ZIPs for every cold lookup (the fake answers "not found" for ZIPs ending in 99)
+    cold = iter(f"{z:05d}" for z in range(10000, 99950) if z % 100 != 99)
+
+    def cold_lookup():
+        zip_code = next(cold)
+        lat, lon = geocoding.geocode_zip(zip_code)
+        geocoding.reverse_geocode(lat, lon)
+
+    def warm_lookup():
+        lat, lon = geocoding.geocode_zip("10001")
+        geocoding.reverse_geocode(lat, lon)
+
+    try:
+        return {
+            "geocode_cold": measure(cold_lookup, repeat),
+            "geocode_cached": measure(warm_lookup, repeat),
+        }
+    finally:
+        server.shutdown()
+
+
+def bench_regional_adjustments(repeat):
+    from regional_adjustments import get_adjustment_table
+    from zip_index import STATE_NAMES
+    table = get_adjustment_table()
+    rng = np.random.default_rng(0)
+    zips = rng.integers(501, 99950, 100000)
+    codes = rng.integers(0, len(STATE_NAMES), 100000)
+    found = np.ones(len(zips), dtype=bool)
+    return {
+        "regional_adjustment": measure(lambda: table.lookup("New Jersey", 7030), repeat),
+        "regional_adjustments_100k": measure(lambda: table.apply(zips, codes, found), max(10, repeat // 10), rows=len(zips)),
+    }
+
+
+def bench_predict(repeat, model_paths, max_rows):
+    from model_kernel import sample_features
+    from prediction_engine import PredictionEngine
+    results = {}
+    X_all = sample_features(max_rows)
+    for model_path in model_paths:
+        if not os.path.exists(model_path):
+            continue
+        engine = PredictionEngine(model_path, use_geocoder=False, use_cache=False)
+        for size in PREDICT_BATCH_SIZES:
+            if size > max_rows:
+                break
+            X = X_all[:size]
+            runs = max(3, min(repeat, int(repeat * 1000 / size)))
+            results[f"predict[{os.path.basename(model_path)}][{size}]"] = measure(lambda: engine.predict(X), runs, rows=size)
+        # Repeated single-row request answered from the prediction cache
+        cached = PredictionEngine(model_path, use_geocoder=False)
+        results[f"predict_cached[{os.path.basename(model_path)}][1]"] = measure(lambda: cached.predict(X_all[:1]), repeat)
+    return results
+
+
+def bench_history(repeat):
+    from prediction_history import PredictionHistory
+    results = {}
+    for size in HISTORY_SIZES:
+        history = PredictionHistory(capacity=max(HISTORY_SIZES))
+        for i in range(size):
+            history.append(3, 2, 1500 + i, 3, 2, "90210", 352234.56 + i, 1.0, 352234.56 + i)
+        # The app formats and renders only the page being shown
+        page = history.page_count() - 1
+        results[f"history_table[{size}]"] = measure(lambda: history.display_page(page).to_html(), max(5, repeat // 10), rows=size)
+    return results
+
+
+def run(repeat=200, model_paths=("model.pkl", "model.npz"), max_rows=1000000, skip_geocoding=False):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        results = {}
+        results.update(bench_zip_validation(repeat))
+        if not skip_geocoding:
+            results.update(bench_geocoding(repeat))
+        results.update(bench_regional_adjustments(repeat))
+        results.update(bench_predict(repeat, model_paths, max_rows))
+        results.update(bench_history(repeat))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+# Stages whose p50 latency got slower than the baseline by more than `tolerance`
+def compare(current, baseline, tolerance=0.2):
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before and result["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append((name, before["p50_ms"], result["p50_ms"]))
+    return regressions
+
+
+def print_report(report):
+    print(f"{'stage':<40}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}{'rows/s':>16}{'peak KB':>12}")
+    for name, r in report["results"].items():
+        rows = f"{r['rows_per_sec']:,.0f}" if r["rows_per_sec"] else "-"
+        print(f"{name:<40}{r['p50_ms']:>12.4f}{r['p95_ms']:>12.4f}{r['p99_ms']:>12.4f}{rows:>16}{r['peak_memory_kb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction flow stage by stage.")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p50 slowdown before a stage counts as regressed")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--max-rows", type=int, default=1000000, help="Largest predict batch")
+    parser.add_argument("--models", nargs="+", default=["model.pkl", "model.npz"])
+    parser.add_argument("--skip-geocoding", action="store_true")
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.models, args.max_rows, args.skip_geocoding)
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.4f} ms -> {after:.4f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
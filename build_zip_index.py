@@ -0,0 +1,72 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from zip_index import ZIP_INDEX_DTYPE, ZIP_INDEX_PATH, ZIP_SLOTS, state_code
+
+
+# Build data/zip_index.npy from a CSV of ZIP codes.
+# The CSV needs a ZIP column, latitude/longitude columns and a state column
+# (two-letter abbreviation or full name). Common column spellings are accepted.
+
+COLUMN_ALIASES = {
+    "zip": ["zip", "zipcode", "zip_code", "postal_code", "zcta"],
+    "lat": ["lat", "latitude"],
+    "lon": ["lon", "lng", "long", "longitude"],
+    "state": ["state", "state_id", "state_abbr", "state_name"],
+}
+
+
+def find_columns(columns):
+    lowered = {c.lower().strip(): c for c in columns}
+    found = {}
+    for key, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered:
+                found[key] = lowered[alias]
+                break
+        else:
+            raise ValueError(f"No {key} column found in CSV (expected one of {aliases})")
+    return found
+
+
+def build_zip_index(csv_path, chunksize=100000):
+    table = np.zeros(ZIP_SLOTS, dtype=ZIP_INDEX_DTYPE)
+    header = pd.read_csv(csv_path, nrows=0)
+    cols = find_columns(header.columns)
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=list(cols.values()),
+        dtype={cols["zip"]: str, cols["state"]: str},
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk = chunk.dropna()
+        zips = pd.to_numeric(chunk[cols["zip"]].str.strip().str.zfill(5), errors="coerce")
+        valid = zips.notna() & (zips >= 0) & (zips < ZIP_SLOTS)
+        chunk = chunk[valid]
+        zips = zips[valid].astype(np.int64).to_numpy()
+
+        table["lat"][zips] = chunk[cols["lat"]].to_numpy(dtype=np.float32)
+        table["lon"][zips] = chunk[cols["lon"]].to_numpy(dtype=np.float32)
+        table["state"][zips] = [state_code(s) for s in chunk[cols["state"]]]
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline ZIP code index used by the app.")
+    parser.add_argument("csv", help="CSV with zip, latitude, longitude and state columns")
+    parser.add_argument("-o", "--output", default=ZIP_INDEX_PATH, help="Output .npy path")
+    args = parser.parse_args()
+
+    table = build_zip_index(args.csv)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.save(args.output, table)
+    print(f"Wrote {np.count_nonzero(table['state'])} ZIP codes to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import sys
+import warnings
+
+import joblib
+import pandas as pd
+
+from model_kernel import NumpyModel, check_parity, export_model, sample_features
+from train import FEATURE_COLUMNS
+
+
+# Export model.pkl to a NumPy-only kernel (model.npz) and check it predicts the same values.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a fitted scikit-learn model into a NumPy-only artifact.")
+    parser.add_argument("model", nargs="?", default="model.pkl")
+    parser.add_argument("-o", "--output", default="model.npz")
+    parser.add_argument("--data", help="Housing CSV to run the parity check on (feature columns are selected by name)")
+    parser.add_argument("--samples", type=int, default=10000, help="Random rows for the parity check when --data is not given")
+    parser.add_argument("--no-verify", action="store_true", help="Skip the parity check")
+    args = parser.parse_args()
+
+    estimator = joblib.load(args.model)
+    export_model(estimator, args.output)
+    print(f"Wrote {args.output}")
+    if args.no_verify:
+        return
+
+    kernel = NumpyModel.load(args.output)
+    if args.data:
+        # By name: the housing CSV has id/Date columns before the features
+        columns = kernel.feature_names or FEATURE_COLUMNS
+        X = pd.read_csv(args.data, usecols=columns)[columns].dropna().to_numpy(dtype="float64")
+    else:
+        X = sample_features(args.samples)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # feature-name warnings from predicting on a bare array
+        ok, max_diff = check_parity(estimator, kernel, X)
+    print(f"Parity check on {len(X)} rows: max abs difference {max_diff:.3g}")
+    if not ok:
+        sys.exit("Exported kernel does not match the original model")
+
+
+if __name__ == "__main__":
+    main()
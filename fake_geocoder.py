@@ -0,0 +1,111 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+# Local stand-in for the Nominatim API, for exercising the geocoding client
+# without touching the real service. Run it and point the app at it:
+#
+#   python fake_geocoder.py --port 8081
+#   GEOCODER_DOMAIN=127.0.0.1:8081 GEOCODER_SCHEME=http streamlit run streamlit_app.py
+#
+# Every ZIP gets a made-up but stable location; ZIPs ending in 99 are "not found".
+# --latency and --error-rate simulate a slow or overloaded upstream.
+
+# State by first ZIP digit, so reverse lookups return something plausible
+REGION_STATES = {
+    '0': 'Massachusetts', '1': 'New York', '2': 'Virginia', '3': 'Florida', '4': 'Ohio',
+    '5': 'Minnesota', '6': 'Illinois', '7': 'Texas', '8': 'Colorado', '9': 'California',
+}
+
+
+def fake_location(zip_code):
+    zip_int = int(zip_code)
+    return 25.0 + (zip_int % 2400) / 100.0, -125.0 + (zip_int % 5700) / 100.0
+
+
+class FakeNominatimHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    error_rate = 0.0
+    requests = 0
+    lock = threading.Lock()
+    # (lat, lon) rounded -> ZIP handed out by /search, so /reverse can answer consistently
+    locations = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.lock:
+            type(self).requests += 1
+        if url.path == "/stats":
+            return self.send_json(200, {"requests": self.requests})
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.send_json(random.choice([429, 503]), {"error": "simulated failure"})
+        if url.path == "/search":
+            return self.send_json(200, self.search(params.get("q", "")))
+        if url.path == "/reverse":
+            return self.send_json(200, self.reverse(float(params["lat"]), float(params["lon"])))
+        self.send_json(404, {"error": "not found"})
+
+    def search(self, query):
+        zip_code = query.split(",")[0].strip()
+        if not (len(zip_code) == 5 and zip_code.isdigit()) or zip_code.endswith("99"):
+            return []
+        lat, lon = fake_location(zip_code)
+        with self.lock:
+            self.locations[(round(lat, 5), round(lon, 5))] = zip_code
+        return [{"lat": str(lat), "lon": str(lon), "display_name": f"{zip_code}, United States"}]
+
+    def reverse(self, lat, lon):
+        zip_code = self.locations.get((round(lat, 5), round(lon, 5)))
+        if zip_code is None:
+            return {"error": "Unable to geocode"}
+        state = REGION_STATES[zip_code[0]]
+        return {
+            "lat": str(lat), "lon": str(lon),
+            "display_name": f"{zip_code}, {state}, United States",
+            "address": {"postcode": zip_code, "state": state, "country": "United States", "country_code": "us"},
+        }
+
+    def send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_fake_geocoder(host="127.0.0.1", port=8081, latency=0.0, error_rate=0.0):
+    handler = type("Handler", (FakeNominatimHandler,), {
+        "latency": latency, "error_rate": error_rate, "requests": 0, "locations": {}, "lock": threading.Lock(),
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Nominatim server for local testing.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    args = parser.parse_args()
+
+    server = make_fake_geocoder(args.host, args.port, args.latency, args.error_rate)
+    print(f"Fake Nominatim on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
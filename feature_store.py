@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from out_of_core import DEFAULT_CHUNKSIZE, iter_clean_chunks
+from prediction_engine import file_sha256
+from train import FEATURE_COLUMNS, TARGET_COLUMN
+
+
+# Columnar feature store for the training data.
+#
+# The raw CSV is cleaned (NaNs and duplicates dropped) and converted once into
+# one .npy file per column in the narrowest dtype that holds it, plus a
+# manifest.json with row count, dtypes and content hashes. Training,
+# evaluation and the notebook memory-map those files instead of re-parsing
+# the CSV, so slicing a column costs no copy.
+
+DEFAULT_STORE_DIR = os.path.join("data", "features")
+
+# Source column -> (file name, dtype)
+COLUMNS = {
+    'number of bedrooms': ("bedrooms", np.uint8),
+    'number of bathrooms': ("bathrooms", np.float32),  # can be fractional (e.g. 2.5)
+    'living area': ("living_area", np.float32),
+    'condition of the house': ("condition", np.uint8),
+    'Number of schools nearby': ("schools", np.uint8),
+    'Price': ("price", np.float32),
+}
+
+COPY_BLOCK = 1 << 20  # rows copied at a time when finalizing a column
+
+
+def _narrow(name, values, dtype):
+    if np.issubdtype(dtype, np.integer):
+        info = np.iinfo(dtype)
+        if np.any(values != np.round(values)) or np.any(values < info.min) or np.any(values > info.max):
+            raise ValueError(f"Column '{name}' has values that do not fit {np.dtype(dtype).name}")
+    return values.astype(dtype)
+
+
+def build_feature_store(csv_path, store_dir=DEFAULT_STORE_DIR, chunksize=DEFAULT_CHUNKSIZE):
+    os.makedirs(store_dir, exist_ok=True)
+    names = FEATURE_COLUMNS + [TARGET_COLUMN]
+    raw_paths = {name: os.path.join(store_dir, COLUMNS[name][0] + ".bin.tmp") for name in names}
+    raw_files = {name: open(path, "wb") for name, path in raw_paths.items()}
+    rows = 0
+    try:
+        # Stream the cleaned chunks into one raw file per column...
+        for X, y, _ in iter_clean_chunks(csv_path, chunksize):
+            for i, name in enumerate(FEATURE_COLUMNS):
+                _narrow(name, X[:, i], COLUMNS[name][1]).tofile(raw_files[name])
+            _narrow(TARGET_COLUMN, y, COLUMNS[TARGET_COLUMN][1]).tofile(raw_files[TARGET_COLUMN])
+            rows += len(y)
+    finally:
+        for f in raw_files.values():
+            f.close()
+
+    # ...then give each one an .npy header so it can be memory-mapped with its dtype
+    manifest_columns = {}
+    for name in names:
+        file_name, dtype = COLUMNS[name]
+        path = os.path.join(store_dir, file_name + ".npy")
+        if rows:
+            raw = np.memmap(raw_paths[name], dtype=dtype, mode="r", shape=(rows,))
+            out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(rows,))
+            for start in range(0, rows, COPY_BLOCK):
+                out[start:start + COPY_BLOCK] = raw[start:start + COPY_BLOCK]
+            out.flush()
+            del out, raw
+        else:
+            np.save(path, np.empty(0, dtype=dtype))
+        os.remove(raw_paths[name])
+        manifest_columns[name] = {"file": file_name + ".npy", "dtype": np.dtype(dtype).name, "sha256": file_sha256(path)}
+
+    content = hashlib.sha256("".join(c["sha256"] for c in manifest_columns.values()).encode()).hexdigest()
+    manifest = {
+        "source": os.path.abspath(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "rows": rows,
+        "columns": manifest_columns,
+        "content_sha256": content,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(store_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class FeatureStore:
+    def __init__(self, store_dir, manifest, columns):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    @property
+    def content_sha256(self):
+        return self.manifest["content_sha256"]
+
+    # Model inputs as float64, optionally for a row range only
+    def Xy(self, start=0, stop=None):
+        X = np.column_stack([self.columns[name][start:stop] for name in FEATURE_COLUMNS]).astype(np.float64)
+        return X, self.columns[TARGET_COLUMN][start:stop].astype(np.float64)
+
+    # pandas view for EDA, with the original column names
+    def to_frame(self, columns=None):
+        return pd.DataFrame({name: self.columns[name] for name in (columns or self.columns)}, copy=False)
+
+
+def load_feature_store(store_dir=DEFAULT_STORE_DIR, mmap=True, verify=False):
+    with open(os.path.join(store_dir, "manifest.json")) as f:
+        manifest = json.load(f)
+    columns = {}
+    for name, info in manifest["columns"].items():
+        path = os.path.join(store_dir, info["file"])
+        if verify and file_sha256(path) != info["sha256"]:
+            raise ValueError(f"Feature store column '{name}' does not match its manifest hash")
+        columns[name] = np.load(path, mmap_mode="r" if mmap else None)
+        if len(columns[name]) != manifest["rows"] or columns[name].dtype != np.dtype(info["dtype"]):
+            raise ValueError(f"Feature store column '{name}' does not match the manifest")
+    return FeatureStore(store_dir, manifest, columns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the housing CSV into the columnar feature store.")
+    parser.add_argument("csv", help="Housing CSV with the five feature columns and Price")
+    parser.add_argument("-o", "--output", default=DEFAULT_STORE_DIR, help="Store directory")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    manifest = build_feature_store(args.csv, args.output, args.chunksize)
+    print(f"Wrote {manifest['rows']:,} rows to {args.output} (content {manifest['content_sha256'][:12]})")
+
+
+if __name__ == "__main__":
+    main()
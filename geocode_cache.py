@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Disk-backed geocoding cache shared by every process on the machine.
+#
+# Entries live in one SQLite file (WAL mode, so readers never block the writer)
+# with a per-entry expiry time and a last-access time used for LRU eviction.
+# A value of None is a negative result ("this ZIP does not exist") and is cached
+# too, with its own, shorter TTL.
+
+GEOCODE_CACHE_PATH = os.environ.get(
+    "GEOCODE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geocode_cache.sqlite3")
+)
+
+DEFAULT_MAX_ENTRIES = 200000
+DEFAULT_TTL = 30 * 24 * 3600      # 30 days
+DEFAULT_NEGATIVE_TTL = 24 * 3600  # 1 day
+EVICT_EVERY = 100                 # writes between eviction passes
+ACCESS_RESOLUTION = 60            # seconds; granularity of last-access updates
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+
+class GeocodeCache:
+    def __init__(self, path=GEOCODE_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES,
+                 ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = threading.local()
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    # One connection per thread (and per process, in case we were forked)
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def _count(self, name, n=1):
+        with self.stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # Returns (hit, value). value may be None on a hit (cached negative result).
+    def get(self, key):
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at, last_access FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            self._count("misses")
+            return False, None
+        # LRU bookkeeping is a write; skip it for entries touched recently
+        if now - row[2] > ACCESS_RESOLUTION:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return True, json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now),
+        )
+        self._count("writes")
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    # Drop expired entries, then the least recently used ones above max_entries
+    def evict(self):
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        self._count("evictions", removed)
+        return removed
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # Counters for this process, plus the shared entry count
+    def stats(self):
+        with self.stats_lock:
+            stats = {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
+        stats["entries"] = len(self)
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_geocode_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GeocodeCache()
+    return _cache
+
+
+# Swap the shared cache, e.g. for a throwaway one in benchmarks
+def set_geocode_cache(cache):
+    global _cache
+    _cache = cache
@@ -0,0 +1,93 @@
+import asyncio
+
+from geopy.exc import GeopyError
+
+from geocode_cache import get_geocode_cache
+from geocoding_client import RETRYABLE_ERRORS, get_geocoding_client
+from metrics import Counter, Histogram
+
+
+# Nominatim lookups, shared by the app and the batch tools.
+# Answers (including "not found") are kept in the shared disk cache; requests go
+# through the process-wide rate-limited client. Timeouts and quota errors that
+# survive the client's retries are counted and raised (the app reports them to the
+# user); they are not cached, so the next call tries again. locate_many returns
+# None for ZIPs that hit one of these errors. Other geocoder errors (bad query,
+# blocked client) are counted and raised everywhere.
+
+CACHE_LOOKUPS = Counter("house_app_geocode_cache_total", "Geocode cache lookups", ["call", "result"])
+GEOCODE_SECONDS = Histogram("house_app_geocode_seconds", "Geocoder latency on cache misses", ["call"])
+GEOCODE_ERRORS = Counter("house_app_geocode_errors_total", "Geocoder calls that failed after retries", ["call", "error"])
+
+
+async def _geocode_zip(client, zip_code):
+    cache = get_geocode_cache()
+    key = f"zip:{zip_code}"
+    hit, location = cache.get(key)
+    CACHE_LOOKUPS.labels(call="forward", result="hit" if hit else "miss").inc()
+    if hit:
+        return tuple(location) if location else None
+    try:
+        with GEOCODE_SECONDS.labels(call="forward").time():
+            location = await client.geocode_zip(zip_code)
+    except GeopyError as e:
+        GEOCODE_ERRORS.labels(call="forward", error=type(e).__name__).inc()
+        raise
+    cache.set(key, location)
+    return location
+
+
+async def _reverse_geocode(client, lat, lon):
+    cache = get_geocode_cache()
+    key = f"state:{lat:.5f},{lon:.5f}"
+    hit, state = cache.get(key)
+    CACHE_LOOKUPS.labels(call="reverse", result="hit" if hit else "miss").inc()
+    if hit:
+        return state
+    try:
+        with GEOCODE_SECONDS.labels(call="reverse").time():
+            state = await client.reverse_geocode(lat, lon)
+    except GeopyError as e:
+        GEOCODE_ERRORS.labels(call="reverse", error=type(e).__name__).inc()
+        raise
+    cache.set(key, state)
+    return state
+
+
+async def _locate(client, zip_code):
+    location = await _geocode_zip(client, zip_code)
+    if location is None:
+        return None
+    lat, lon = location
+    return lat, lon, await _reverse_geocode(client, lat, lon)
+
+
+async def _locate_many(client, zip_codes):
+    results = await asyncio.gather(*(_locate(client, zip_code) for zip_code in zip_codes), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, RETRYABLE_ERRORS):
+            raise result
+    return {zip_code: None if isinstance(result, BaseException) else result for zip_code, result in zip(zip_codes, results)}
+
+
+def geocode_zip(zip_code):
+    client = get_geocoding_client()
+    return client.run(_geocode_zip(client, zip_code))
+
+
+def reverse_geocode(lat, lon):
+    client = get_geocoding_client()
+    return client.run(_reverse_geocode(client, lat, lon))
+
+
+# ZIP -> (lat, lon, state), or None if the ZIP could not be geocoded; raises on timeouts and quota errors
+def locate(zip_code):
+    client = get_geocoding_client()
+    return client.run(_locate(client, zip_code))
+
+
+# Many ZIPs at once; lookups run concurrently within the client's rate limit.
+# ZIPs that time out or hit the quota map to None and are retried on a later call.
+def locate_many(zip_codes):
+    client = get_geocoding_client()
+    return client.run(_locate_many(client, list(zip_codes)))
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from geopy.geocoders import Nominatim
+from geopy.exc import GeocoderQuotaExceeded, GeocoderTimedOut, GeocoderUnavailable, GeopyError
+
+from metrics import Counter, Histogram
+
+
+# Shared, rate-limited geocoding client.
+#
+# One Nominatim instance per process, used from a dedicated asyncio loop thread:
+#   - a token bucket caps the request rate across every caller in the process
+#   - concurrent lookups of the same key share a single in-flight request
+#   - at most max_concurrency requests are on the wire at once
+#   - timeouts, 429s and 502/503/504 responses are retried with exponential backoff;
+#     other errors (bad query, 403 block, parse errors) are raised straight away
+# Point GEOCODER_DOMAIN / GEOCODER_SCHEME at fake_geocoder.py to run it locally.
+
+GEOCODER_DOMAIN = os.environ.get("GEOCODER_DOMAIN", "nominatim.openstreetmap.org")
+GEOCODER_SCHEME = os.environ.get("GEOCODER_SCHEME", "https")
+GEOCODER_RATE = float(os.environ.get("GEOCODER_RATE", "1"))  # requests per second (Nominatim policy)
+GEOCODER_CONCURRENCY = int(os.environ.get("GEOCODER_CONCURRENCY", "2"))
+
+# GeocoderQuotaExceeded includes GeocoderRateLimited (429). Not GeocoderServiceError:
+# it is the base of every geopy error, including permanent ones such as a 403 block.
+RETRYABLE_ERRORS = (GeocoderTimedOut, GeocoderQuotaExceeded, GeocoderUnavailable)
+
+UPSTREAM_REQUESTS = Counter("house_app_geocoder_requests_total", "Requests sent to the geocoding service", ["outcome"])
+UPSTREAM_SECONDS = Histogram("house_app_geocoder_request_seconds", "Latency of single geocoding service requests")
+COALESCED_REQUESTS = Counter("house_app_geocoder_coalesced_total", "Lookups that joined an in-flight request")
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Take a token, returning how long the caller must wait before using it
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class GeocodingClient:
+    def __init__(self, domain=GEOCODER_DOMAIN, scheme=GEOCODER_SCHEME, rate=GEOCODER_RATE,
+                 max_concurrency=GEOCODER_CONCURRENCY, retries=3, backoff=0.5, timeout=10):
+        self.geolocator = Nominatim(user_agent="house_price_app", domain=domain, scheme=scheme, timeout=timeout)
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.inflight = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="geocoding-client", daemon=True)
+        self.thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # Run a coroutine on the client loop from any thread and wait for the result
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _call(self, fn, *args, **kwargs):
+        async with self.semaphore:
+            for attempt in range(self.retries + 1):
+                await self.bucket.acquire()
+                self.requests += 1
+                try:
+                    with UPSTREAM_SECONDS.time():
+                        result = await asyncio.to_thread(fn, *args, **kwargs)
+                    UPSTREAM_REQUESTS.labels(outcome="ok").inc()
+                    return result
+                except RETRYABLE_ERRORS:
+                    if attempt == self.retries:
+                        UPSTREAM_REQUESTS.labels(outcome="failed").inc()
+                        raise
+                    UPSTREAM_REQUESTS.labels(outcome="retried").inc()
+                    self.retried += 1
+                    await asyncio.sleep(self.backoff * 2 ** attempt * (1 + random.random()))
+                except GeopyError:
+                    UPSTREAM_REQUESTS.labels(outcome="rejected").inc()
+                    raise
+
+    # Callers asking for the same key while a lookup is running wait on that lookup
+    async def _coalesced(self, key, fn, *args, **kwargs):
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            COALESCED_REQUESTS.inc()
+            return await asyncio.shield(future)
+        future = self.loop.create_task(self._call(fn, *args, **kwargs))
+        self.inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    async def geocode_zip(self, zip_code):
+        location = await self._coalesced(f"zip:{zip_code}", self.geolocator.geocode, f"{zip_code}, USA")
+        if location:
+            return location.latitude, location.longitude
+        return None
+
+    async def reverse_geocode(self, lat, lon):
+        location = await self._coalesced(f"state:{lat:.5f},{lon:.5f}", self.geolocator.reverse, (lat, lon), language='en')
+        if location is None:
+            return 'Unknown'
+        return location.raw.get('address', {}).get('state', 'Unknown')
+
+    def stats(self):
+        return {"requests": self.requests, "coalesced": self.coalesced, "retried": self.retried, "inflight": len(self.inflight)}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_geocoding_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeocodingClient()
+    return _client
+
+
+# Swap the shared client, e.g. for one pointed at fake_geocoder.py
+def set_geocoding_client(client):
+    global _client
+    _client = client
@@ -0,0 +1,93 @@
+import functools
+import html
+import math
+import os
+
+import folium
+import streamlit as st
+
+from prediction_engine import US_CENTER
+
+
+# Location map for the app.
+#
+# The Leaflet page for a (lat, lon, zoom, marker) is generated once and reused
+# on every rerun and by every session in the process, instead of building a new
+# folium.Map each time. The "static" variant is a few positioned OSM tile images
+# with a marker dot: no Leaflet JS/CSS, far fewer bytes for slow connections.
+
+MAP_WIDTH = 700
+MAP_HEIGHT = 300
+DEFAULT_ZOOM = 10
+TILE_SIZE = 256
+TILE_URL = os.environ.get("MAP_TILE_URL", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+
+
+@functools.lru_cache(maxsize=512)
+def _interactive_html(lat, lon, zoom, popup, tooltip):
+    m = folium.Map(location=[lat, lon], zoom_start=zoom)
+    folium.Marker([lat, lon], popup=popup, tooltip=tooltip).add_to(m)
+    return folium.Figure().add_child(m).render()
+
+
+# Web Mercator pixel position of a point at a zoom level
+def _world_pixel(lat, lon, zoom):
+    scale = TILE_SIZE * 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    siny = math.sin(math.radians(lat))
+    x = (lon + 180.0) / 360.0 * scale
+    y = (0.5 - math.log((1 + siny) / (1 - siny)) / (4 * math.pi)) * scale
+    return x, y
+
+
+@functools.lru_cache(maxsize=512)
+def _static_html(lat, lon, zoom, tooltip, width, height):
+    cx, cy = _world_pixel(lat, lon, zoom)
+    left, top = cx - width / 2, cy - height / 2
+    n_tiles = 2 ** zoom
+    tiles = []
+    for ty in range(int(top // TILE_SIZE), int((top + height) // TILE_SIZE) + 1):
+        if not 0 <= ty < n_tiles:
+            continue
+        for tx in range(int(left // TILE_SIZE), int((left + width) // TILE_SIZE) + 1):
+            url = TILE_URL.format(z=zoom, x=tx % n_tiles, y=ty)
+            tiles.append(
+                f'<img src="{url}" alt="" width="{TILE_SIZE}" height="{TILE_SIZE}" '
+                f'style="position:absolute;left:{tx * TILE_SIZE - left:.0f}px;top:{ty * TILE_SIZE - top:.0f}px;max-width:none">'
+            )
+    marker = (
+        f'<div title="{html.escape(tooltip or "")}" style="position:absolute;left:{width / 2 - 7:.0f}px;top:{height / 2 - 7:.0f}px;'
+        'width:14px;height:14px;border-radius:50%;background:#2a81cb;border:2px solid #fff;box-shadow:0 0 3px #000"></div>'
+    )
+    return (
+        f'<div style="position:relative;width:{width}px;max-width:100%;height:{height}px;overflow:hidden;background:#ddd">'
+        + "".join(tiles) + marker + "</div>"
+    )
+
+
+# Cache keys use coordinates rounded to ~1 m so float noise does not defeat the cache
+def map_html(lat, lon, zoom=DEFAULT_ZOOM, popup=None, tooltip=None):
+    return _interactive_html(round(float(lat), 5), round(float(lon), 5), zoom, popup, tooltip)
+
+
+def static_map_html(lat, lon, zoom=DEFAULT_ZOOM, tooltip=None, width=MAP_WIDTH, height=MAP_HEIGHT):
+    return _static_html(round(float(lat), 5), round(float(lon), 5), zoom, tooltip, width, height)
+
+
+# Built once at import; every error branch in the app reuses it
+FALLBACK_MAP_HTML = map_html(*US_CENTER, popup="Default Location", tooltip="US Center")
+FALLBACK_STATIC_MAP_HTML = static_map_html(*US_CENTER, tooltip="US Center")
+
+
+def show_map(lat, lon, popup=None, tooltip=None, static=False, zoom=DEFAULT_ZOOM):
+    if static:
+        st.markdown(static_map_html(lat, lon, zoom, tooltip), unsafe_allow_html=True)
+    else:
+        st.iframe(map_html(lat, lon, zoom, popup, tooltip), width=MAP_WIDTH, height=MAP_HEIGHT + 10)
+
+
+def show_fallback_map(static=False):
+    if static:
+        st.markdown(FALLBACK_STATIC_MAP_HTML, unsafe_allow_html=True)
+    else:
+        st.iframe(FALLBACK_MAP_HTML, width=MAP_WIDTH, height=MAP_HEIGHT + 10)
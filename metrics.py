@@ -0,0 +1,281 @@
+import collections
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# In-process metrics in Prometheus text format, without extra dependencies.
+#
+#   GEOCODE_LATENCY = Histogram("geocode_seconds", "Geocoder latency", ["call"])
+#   with GEOCODE_LATENCY.labels(call="forward").time():
+#       ...
+#
+# start_metrics_server() serves /metrics (and /profile when the sampling
+# profiler is enabled with HOUSE_APP_PROFILE=1) from a daemon thread.
+
+# 9100 is node_exporter's port, so the default stays clear of it
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9848"))
+PROFILE_ENABLED = os.environ.get("HOUSE_APP_PROFILE", "0") == "1"
+PROFILE_INTERVAL = float(os.environ.get("HOUSE_APP_PROFILE_INTERVAL", "0.01"))
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children = {}
+        self.lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    # Unlabelled metrics are used directly: COUNTER.inc()
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self.children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_label_text(labelnames, key)} {_number(self.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, key):
+        lines = []
+        cumulative = 0
+        with self.lock:
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labelnames, key)} {_number(self.sum)}")
+            lines.append(f"{name}_count{_label_text(labelnames, key)} {self.count}")
+        return lines
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self.metrics[metric.name] = metric
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Shared across modules: latency of each stage of the prediction flow
+STAGE_LATENCY = Histogram("house_app_stage_seconds", "Latency of each prediction flow stage", ["stage"])
+
+# Location lookups in the app and how many of them ended on the US-center fallback map.
+# Fallback rate: rate(house_app_location_fallbacks_total[5m]) / rate(house_app_location_requests_total[5m])
+LOCATION_REQUESTS = Counter("house_app_location_requests_total", "Location lookups rendered by the app")
+LOCATION_FALLBACKS = Counter("house_app_location_fallbacks_total", "Location lookups that fell back to the US center", ["reason"])
+
+
+class SamplingProfiler:
+    # Samples every thread's Python stack at a fixed interval and keeps counts of
+    # collapsed stacks ("a;b;c count"), the input format of flamegraph tools.
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self):
+        with self.lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+PROFILER = SamplingProfiler() if PROFILE_ENABLED else None
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.send_text(200, REGISTRY.render(), "text/plain; version=0.0.4")
+        elif self.path == "/profile" and PROFILER is not None:
+            self.send_text(200, PROFILER.collapsed(), "text/plain")
+        else:
+            self.send_text(404, "Not found\n", "text/plain")
+
+    def send_text(self, status, text, content_type):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Start the /metrics endpoint once per process. Returns None if the port is taken
+# (e.g. by another worker on the same host).
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    global _server
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError as e:
+                logger.warning("Metrics endpoint not started: cannot bind %s:%s (%s)", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            if PROFILER is not None:
+                PROFILER.start()
+    return _server
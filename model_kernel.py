@@ -0,0 +1,140 @@
+import numpy as np
+
+
+# Pure-NumPy inference for the fitted models the notebook produces.
+#
+# export_model() flattens a scikit-learn estimator into plain arrays saved as .npz:
+#   - linear models: coef / intercept
+#   - decision trees and random forests: one node table for all trees
+# NumpyModel loads that file and predicts without importing scikit-learn.
+#
+# Only export_model() touches scikit-learn objects; NumpyModel needs NumPy alone.
+
+ROW_BLOCK = 65536  # rows evaluated at a time by the tree kernel, bounds temporary memory
+
+
+def _unwrap(estimator):
+    # GridSearchCV / RandomizedSearchCV -> fitted best estimator
+    return getattr(estimator, "best_estimator_", estimator)
+
+
+def _tree_arrays(estimators):
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Only single-output trees can be exported")
+        leaf = tree.children_left < 0
+        roots.append(offset)
+        features.append(np.where(leaf, -1, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        # Leaves point at themselves so traversal can run a fixed number of steps
+        own = np.arange(tree.node_count, dtype=np.int32) + offset
+        lefts.append(np.where(leaf, own, tree.children_left + offset).astype(np.int32))
+        rights.append(np.where(leaf, own, tree.children_right + offset).astype(np.int32))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    return {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.array(max_depth),
+    }
+
+
+def export_model(estimator, path):
+    estimator = _unwrap(estimator)
+    arrays = {}
+    if hasattr(estimator, "coef_"):
+        coef = np.atleast_2d(np.asarray(estimator.coef_, dtype=np.float64))
+        intercept = np.atleast_1d(np.asarray(estimator.intercept_, dtype=np.float64))
+        arrays.update(kind="linear", coef=coef, intercept=np.broadcast_to(intercept, coef.shape[:1]).copy(),
+                      output_2d=np.array(np.ndim(estimator.coef_) == 2))
+    elif hasattr(estimator, "estimators_"):
+        arrays.update(kind="trees", **_tree_arrays(estimator.estimators_), output_2d=np.array(False))
+    elif hasattr(estimator, "tree_"):
+        arrays.update(kind="trees", **_tree_arrays([estimator]), output_2d=np.array(False))
+    else:
+        raise ValueError(f"Cannot export {type(estimator).__name__}: only linear models and tree ensembles are supported")
+
+    names = getattr(estimator, "feature_names_in_", None)
+    arrays["feature_names"] = np.array([] if names is None else list(names), dtype=str)
+    arrays["n_features"] = np.array(estimator.n_features_in_)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+class NumpyModel:
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.n_features_in_ = int(arrays["n_features"])
+        self.feature_names = [str(n) for n in arrays["feature_names"]]
+        self.output_2d = bool(arrays["output_2d"])
+        if self.kind == "linear":
+            self.coef = arrays["coef"]
+            self.intercept = arrays["intercept"]
+        elif self.kind == "trees":
+            self.feature = arrays["feature"]
+            self.threshold = arrays["threshold"]
+            self.left = arrays["left"]
+            self.right = arrays["right"]
+            self.value = arrays["value"]
+            self.roots = arrays["roots"]
+            self.max_depth = int(arrays["max_depth"])
+        else:
+            raise ValueError(f"Unknown model kind '{self.kind}'")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2-D array with {self.n_features_in_} features")
+        if self.kind == "linear":
+            y = X @ self.coef.T + self.intercept
+            return y if self.output_2d else y[:, 0]
+        y = np.empty(len(X))
+        for start in range(0, len(X), ROW_BLOCK):
+            y[start:start + ROW_BLOCK] = self._predict_trees(X[start:start + ROW_BLOCK])
+        return y
+
+    def _predict_trees(self, X):
+        # scikit-learn compares float32 inputs against float64 thresholds
+        X = X.astype(np.float32)
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            feature = self.feature[node]
+            go_left = X[rows, np.maximum(feature, 0)] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].mean(axis=1)
+
+
+# Compare the exported kernel with the original estimator on X.
+# Returns (within tolerance, largest absolute difference).
+def check_parity(estimator, kernel, X, rtol=1e-7, atol=1e-6):
+    expected = np.asarray(estimator.predict(X), dtype=np.float64).reshape(len(X), -1)[:, 0]
+    actual = np.asarray(kernel.predict(X), dtype=np.float64).reshape(len(X), -1)[:, 0]
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    return bool(np.allclose(actual, expected, rtol=rtol, atol=atol)), max_diff
+
+
+# Random but plausible feature rows, for parity checks when no data file is at hand
+def sample_features(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, 11, n),        # bedrooms
+        rng.integers(0, 9, n),         # bathrooms
+        rng.integers(200, 15001, n),   # living area
+        rng.integers(1, 6, n),         # condition
+        rng.integers(0, 6, n),         # schools
+    ]).astype(np.float64)
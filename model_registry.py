@@ -0,0 +1,304 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+
+import joblib
+import numpy as np
+
+from metrics import Counter, Histogram
+from model_kernel import export_model
+from prediction_engine import FEATURES, PredictionEngine, file_sha256, load_model
+
+
+# Local model registry.
+#
+#   models/
+#     v0001/  model.pkl  model.npz  metadata.json
+#     v0002/  ...
+#     CURRENT   <- version the app and the API serve
+#     SHADOW    <- optional candidate scored in the background on live traffic
+#
+# Version directories are written under a temporary name and renamed into place,
+# and the pointer files are swapped with os.replace, so a reader never sees a
+# half-written model. Serving processes pick up a new CURRENT without a restart.
+#
+#   python model_registry.py register model.pkl --report metrics.json
+#   python model_registry.py promote v0002
+#   python model_registry.py shadow v0003      (--off to stop)
+#   python model_registry.py list
+
+REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "models")
+
+logger = logging.getLogger(__name__)
+
+SHADOW_ROWS = Counter("house_app_shadow_rows_total", "Rows scored by the shadow model")
+SHADOW_DROPPED = Counter("house_app_shadow_dropped_total", "Batches skipped because the shadow queue was full")
+SHADOW_ABS_DELTA = Histogram("house_app_shadow_abs_delta_dollars", "Absolute shadow - serving prediction difference",
+                             buckets=(100, 1000, 5000, 10000, 25000, 50000, 100000, 250000))
+
+
+def list_versions(registry_dir=REGISTRY_DIR):
+    if not os.path.isdir(registry_dir):
+        return []
+    return sorted(name for name in os.listdir(registry_dir)
+                  if name.startswith("v") and os.path.isfile(os.path.join(registry_dir, name, "metadata.json")))
+
+
+def load_metadata(version, registry_dir=REGISTRY_DIR):
+    with open(os.path.join(registry_dir, version, "metadata.json")) as f:
+        return json.load(f)
+
+
+# Served artifact of a version: the NumPy kernel when it could be exported, else the pickle
+def version_model_path(version, registry_dir=REGISTRY_DIR):
+    kernel = os.path.join(registry_dir, version, "model.npz")
+    return kernel if os.path.exists(kernel) else os.path.join(registry_dir, version, "model.pkl")
+
+
+def _read_pointer(registry_dir, name):
+    try:
+        with open(os.path.join(registry_dir, name)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(registry_dir, name, version):
+    if version is not None and version not in list_versions(registry_dir):
+        raise ValueError(f"Unknown model version '{version}'")
+    path = os.path.join(registry_dir, name)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, path)
+
+
+def current_version(registry_dir=REGISTRY_DIR):
+    return _read_pointer(registry_dir, "CURRENT")
+
+
+def shadow_version(registry_dir=REGISTRY_DIR):
+    return _read_pointer(registry_dir, "SHADOW")
+
+
+def promote(version, registry_dir=REGISTRY_DIR):
+    _write_pointer(registry_dir, "CURRENT", version)
+
+
+def set_shadow(version, registry_dir=REGISTRY_DIR):
+    _write_pointer(registry_dir, "SHADOW", version)
+
+
+def current_model_path(registry_dir=REGISTRY_DIR):
+    version = current_version(registry_dir)
+    return version_model_path(version, registry_dir) if version else None
+
+
+def shadow_model_path(registry_dir=REGISTRY_DIR):
+    version = shadow_version(registry_dir)
+    return version_model_path(version, registry_dir) if version else None
+
+
+# Add a fitted estimator (or a saved .pkl) as the next version and return its name
+def register_model(model, registry_dir=REGISTRY_DIR, report=None, source=None, activate=False):
+    if isinstance(model, str):
+        source = source or os.path.abspath(model)
+        model = joblib.load(model)
+    os.makedirs(registry_dir, exist_ok=True)
+    tmp = os.path.join(registry_dir, f".tmp-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(tmp)
+    try:
+        joblib.dump(model, os.path.join(tmp, "model.pkl"))
+        artifacts = {"model.pkl": file_sha256(os.path.join(tmp, "model.pkl"))}
+        try:
+            export_model(model, os.path.join(tmp, "model.npz"))
+            artifacts["model.npz"] = file_sha256(os.path.join(tmp, "model.npz"))
+        except ValueError as e:
+            logger.warning("Registering without a NumPy kernel: %s", e)
+        metadata = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model_type": type(getattr(model, "best_estimator_", model)).__name__,
+            "features": list(FEATURES),
+            "artifacts": artifacts,
+            "source": source,
+            "report": report,
+        }
+
+        # The rename fails if another process took the same number first; try the next one
+        while True:
+            versions = list_versions(registry_dir)
+            version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+            metadata["version"] = version
+            with open(os.path.join(tmp, "metadata.json"), "w") as f:
+                json.dump(metadata, f, indent=2, default=str)
+            try:
+                os.rename(tmp, os.path.join(registry_dir, version))
+                break
+            except OSError:
+                if not os.path.exists(os.path.join(registry_dir, version)):
+                    raise
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    if activate or current_version(registry_dir) is None:
+        promote(version, registry_dir)
+    return version
+
+
+class ShadowScorer:
+    # Scores a candidate model on the same inputs as the serving model, off the
+    # request path: submit() only enqueues (and drops the batch if the queue is
+    # full), a worker thread predicts and appends delta summaries to a JSON-lines log.
+    # close() stops the worker; engines call it when they are replaced.
+
+    def __init__(self, model_path, log_path=None, max_pending=100):
+        self.model = load_model(model_path)
+        self.model_path = model_path
+        self.log_path = log_path or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(model_path))), "shadow.jsonl")
+        self.pending = queue.Queue(max_pending)
+        self.closed = False
+        self.worker = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self.worker.start()
+
+    # X and predictions are copied: callers (e.g. PredictionEngine.score) go on to modify their arrays
+    def submit(self, X, predictions):
+        if self.closed:
+            return
+        try:
+            self.pending.put_nowait((np.array(X, dtype=np.float64), np.array(predictions, dtype=np.float64)))
+        except queue.Full:
+            SHADOW_DROPPED.inc()
+
+    # Pending batches are dropped; None wakes the worker up and tells it to exit
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.pending.get_nowait()
+            except queue.Empty:
+                break
+        self.pending.put(None)
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.model = None
+                return
+            X, predictions = item
+            try:
+                shadow = np.asarray(self.model.predict(X), dtype=np.float64).reshape(len(X), -1)[:, 0]
+                delta = shadow - predictions
+                delta = delta[np.isfinite(delta)]
+                if not len(delta):
+                    continue
+                SHADOW_ROWS.inc(len(delta))
+                for value in np.abs(delta):
+                    SHADOW_ABS_DELTA.observe(float(value))
+                record = {
+                    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "shadow": self.model_path,
+                    "rows": len(delta),
+                    "mean_delta": float(delta.mean()),
+                    "mean_abs_delta": float(np.abs(delta).mean()),
+                    "max_abs_delta": float(np.abs(delta).max()),
+                }
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(record, allow_nan=False) + "\n")
+            except Exception:
+                logger.exception("Shadow scoring failed")
+
+
+# Engine for the registry's CURRENT version, with the SHADOW version attached if one is set
+def load_registry_engine(registry_dir=REGISTRY_DIR, **engine_kwargs):
+    version = current_version(registry_dir)
+    if version is None:
+        raise ValueError(f"No model has been promoted in '{registry_dir}'")
+    engine = PredictionEngine(version_model_path(version, registry_dir), **engine_kwargs)
+    engine.model_metadata = load_metadata(version, registry_dir)
+    shadow = shadow_version(registry_dir)
+    if shadow is not None and shadow != version:
+        engine.shadow = ShadowScorer(version_model_path(shadow, registry_dir))
+    return engine
+
+
+class RegistryWatcher:
+    # Polls the pointer files and calls on_swap(new_engine) after a new CURRENT or
+    # SHADOW version has been loaded and warmed up; requests keep using the old
+    # engine until the swap, so there is no gap in service.
+
+    def __init__(self, on_swap, registry_dir=REGISTRY_DIR, interval=5.0, **engine_kwargs):
+        self.on_swap = on_swap
+        self.registry_dir = registry_dir
+        self.interval = interval
+        self.engine_kwargs = engine_kwargs
+        self.state = (current_version(registry_dir), shadow_version(registry_dir))
+        self.thread = threading.Thread(target=self._run, name="registry-watcher", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            state = (current_version(self.registry_dir), shadow_version(self.registry_dir))
+            if state == self.state or state[0] is None:
+                continue
+            try:
+                engine = load_registry_engine(self.registry_dir, **self.engine_kwargs)
+                engine.warm_up()
+            except Exception:
+                logger.exception("Could not load model version %s; still serving the previous one", state[0])
+                continue
+            self.state = state
+            self.on_swap(engine)
+            logger.warning("Now serving model %s (shadow: %s)", state[0], state[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local model registry.")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    register = commands.add_parser("register", help="Add a saved model as a new version")
+    register.add_argument("model", help="Pickled estimator")
+    register.add_argument("--report", help="Training report (metrics.json) to store with it")
+    register.add_argument("--activate", action="store_true", help="Serve it right away")
+    commands.add_parser("promote", help="Serve a version").add_argument("version")
+    shadow = commands.add_parser("shadow", help="Shadow-score a version on live traffic")
+    shadow.add_argument("version", nargs="?")
+    shadow.add_argument("--off", action="store_true")
+    commands.add_parser("list", help="Show registered versions")
+    args = parser.parse_args()
+
+    if args.command == "register":
+        report = None
+        if args.report:
+            with open(args.report) as f:
+                report = json.load(f)
+        print(register_model(args.model, args.registry, report, activate=args.activate))
+    elif args.command == "promote":
+        promote(args.version, args.registry)
+    elif args.command == "shadow":
+        if not args.off and not args.version:
+            parser.error("shadow needs a version or --off")
+        set_shadow(None if args.off else args.version, args.registry)
+    else:
+        current, candidate = current_version(args.registry), shadow_version(args.registry)
+        for version in list_versions(args.registry):
+            metadata = load_metadata(version, args.registry)
+            best = (metadata.get("report") or {}).get("models", {}).get((metadata.get("report") or {}).get("best_model"), {})
+            mae = f"test MAE {best['test_mae']:,.0f}" if best.get("test_mae") is not None else ""
+            flag = " (serving)" if version == current else " (shadow)" if version == candidate else ""
+            print(f"{version}  {metadata['created']}  {metadata['model_type']:<24}{mae}{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from train import FEATURE_COLUMNS, TARGET_COLUMN
+
+
+# Training on housing files larger than memory.
+#
+# The source is streamed in chunks holding only the five feature columns and
+# Price, as float32. Duplicate rows are dropped by hashing each row into a
+# compact set of 64-bit hashes instead of keeping a copy of the frame, and the
+# linear model is fitted from running sums, so peak memory depends on the
+# chunk size and the number of distinct rows (8 bytes each), not the file size.
+
+DEFAULT_CHUNKSIZE = 200000
+TEST_FRACTION_MOD = 5  # rows whose hash % 5 == 0 form the 20% hold-out set
+
+COLUMN_DTYPES = {column: np.float32 for column in FEATURE_COLUMNS + [TARGET_COLUMN]}
+
+
+class RowHashSet:
+    # Set of uint64 row hashes kept as one large sorted array plus a smaller
+    # sorted buffer that is merged in once it grows past a fraction of the main one.
+
+    def __init__(self):
+        self.main = np.empty(0, dtype=np.uint64)
+        self.buffer = np.empty(0, dtype=np.uint64)
+
+    @staticmethod
+    def _contains(sorted_array, values):
+        if not len(sorted_array):
+            return np.zeros(len(values), dtype=bool)
+        pos = np.searchsorted(sorted_array, values)
+        pos[pos == len(sorted_array)] = 0
+        return sorted_array[pos] == values
+
+    # Record hashes and return a mask of the ones that were not seen before
+    # (only the first occurrence of a repeated hash within the batch counts as new)
+    def add(self, hashes):
+        unique, first = np.unique(hashes, return_index=True)
+        fresh = ~(self._contains(self.main, unique) | self._contains(self.buffer, unique))
+        self.buffer = np.union1d(self.buffer, unique[fresh])
+        if len(self.buffer) > max(1 << 16, len(self.main) // 8):
+            self.main = np.union1d(self.main, self.buffer)
+            self.buffer = np.empty(0, dtype=np.uint64)
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[fresh]] = True
+        return mask
+
+    def __len__(self):
+        return len(self.main) + len(self.buffer)
+
+
+# Yield (X, y, row_hashes) for each chunk, with NaN rows and duplicates removed
+def iter_clean_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    seen = RowHashSet()
+    reader = pd.read_csv(path, usecols=FEATURE_COLUMNS + [TARGET_COLUMN], dtype=COLUMN_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        chunk = chunk[FEATURE_COLUMNS + [TARGET_COLUMN]].dropna()
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        keep = seen.add(hashes)
+        if not keep.any():
+            continue
+        chunk = chunk[keep]
+        yield chunk[FEATURE_COLUMNS].to_numpy(), chunk[TARGET_COLUMN].to_numpy(), hashes[keep]
+
+
+class StreamingLinearRegression:
+    # Least squares from running sums of (x - shift) and (y - shift).
+    # The shift is the first chunk's mean, which keeps the sums well conditioned.
+
+    def __init__(self, n_features=len(FEATURE_COLUMNS)):
+        self.n = 0
+        self.shift_x = None
+        self.shift_y = 0.0
+        self.sum_x = np.zeros(n_features)
+        self.sum_y = 0.0
+        self.sxx = np.zeros((n_features, n_features))
+        self.sxy = np.zeros(n_features)
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if not len(X):
+            return self
+        if self.shift_x is None:
+            self.shift_x = X.mean(axis=0)
+            self.shift_y = float(y.mean())
+        Xc = X - self.shift_x
+        yc = y - self.shift_y
+        self.n += len(X)
+        self.sum_x += Xc.sum(axis=0)
+        self.sum_y += float(yc.sum())
+        self.sxx += Xc.T @ Xc
+        self.sxy += Xc.T @ yc
+        return self
+
+    # A regular LinearRegression, so the result is saved and served like any other model
+    def to_estimator(self):
+        if self.n == 0:
+            raise ValueError("No training rows were seen")
+        mean_x = self.sum_x / self.n
+        mean_y = self.sum_y / self.n
+        cov_xx = self.sxx / self.n - np.outer(mean_x, mean_x)
+        cov_xy = self.sxy / self.n - mean_x * mean_y
+        coef = np.linalg.lstsq(cov_xx, cov_xy, rcond=None)[0]
+        model = LinearRegression()
+        model.coef_ = coef
+        model.intercept_ = float(self.shift_y + mean_y - (self.shift_x + mean_x) @ coef)
+        model.n_features_in_ = len(coef)
+        return model
+
+
+def train_out_of_core(path, chunksize=DEFAULT_CHUNKSIZE, verbose=True):
+    # Pass 1: fit on the training rows
+    regression = StreamingLinearRegression()
+    n_train = 0
+    for X, y, hashes in iter_clean_chunks(path, chunksize):
+        train = hashes % TEST_FRACTION_MOD != 0
+        regression.partial_fit(X[train], y[train])
+        n_train += int(train.sum())
+        if verbose:
+            print(f"[out-of-core] fitted {n_train:,} rows")
+    model = regression.to_estimator()
+
+    # Pass 2: streaming MAE / R² on the hold-out rows
+    n_test, abs_error, sq_error, sum_y, sum_y2 = 0, 0.0, 0.0, 0.0, 0.0
+    for X, y, hashes in iter_clean_chunks(path, chunksize):
+        test = hashes % TEST_FRACTION_MOD == 0
+        y_test = y[test].astype(np.float64)
+        residual = y_test - model.predict(X[test].astype(np.float64))
+        n_test += len(y_test)
+        abs_error += float(np.abs(residual).sum())
+        sq_error += float((residual ** 2).sum())
+        sum_y += float(y_test.sum())
+        sum_y2 += float((y_test ** 2).sum())
+
+    metrics = {"best_params": {}, "cv_mae": None, "test_mae": None, "test_r2": None}
+    if n_test:
+        total = sum_y2 - sum_y ** 2 / n_test
+        metrics.update(test_mae=abs_error / n_test, test_r2=1 - sq_error / total if total else None)
+        metrics["cv_mae"] = metrics["test_mae"]  # hold-out MAE stands in for CV when streaming
+    report = {"n_train": n_train, "n_test": n_test, "chunksize": chunksize, "models": {"linear": metrics}, "best_model": "linear"}
+    return model, report
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from metrics import Counter, Gauge
+
+
+# Process-wide cache of raw model outputs, keyed by model version and the five
+# feature values. Popular inputs (3 bed / 2 bath / 1500 sqft ...) are scored once
+# and shared by every session. Location multipliers are applied by the caller
+# after the lookup, so one entry serves every ZIP.
+#
+# Entries are evicted least recently used first. Keys include the model version
+# (a hash of the model file), and the cache empties itself when a different
+# version asks, so a replaced model.pkl never gets stale answers.
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "10000"))
+
+# Larger batches go straight to the model; per-row lookups would cost more than they save
+MAX_CACHED_BATCH = 64
+
+CACHE_LOOKUPS = Counter("house_app_prediction_cache_total", "Prediction cache lookups", ["result"])
+CACHE_EVICTIONS = Counter("house_app_prediction_cache_evictions_total", "Prediction cache entries evicted")
+CACHE_ENTRIES = Gauge("house_app_prediction_cache_entries", "Prediction cache entries")
+
+
+class PredictionCache:
+    def __init__(self, max_entries=PREDICTION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.model_version = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            CACHE_ENTRIES.set(0)
+
+    # predict(X) for rows of X, reusing cached outputs; predict is only called for the misses
+    def predict(self, model_version, X, predict):
+        keys = [(model_version,) + row for row in map(tuple, X.tolist())]
+        out = np.empty(len(keys), dtype=np.float64)
+        missing = []
+        with self.lock:
+            if model_version != self.model_version:
+                self.entries.clear()
+                self.model_version = model_version
+            for i, key in enumerate(keys):
+                value = self.entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self.entries.move_to_end(key)
+                    out[i] = value
+        hits = len(keys) - len(missing)
+        CACHE_LOOKUPS.labels(result="hit").inc(hits)
+        CACHE_LOOKUPS.labels(result="miss").inc(len(missing))
+        if not missing:
+            with self.lock:
+                self.hits += hits
+            return out
+
+        out[missing] = predict(X[missing])
+        with self.lock:
+            self.hits += hits
+            self.misses += len(missing)
+            if model_version == self.model_version:
+                for i in missing:
+                    self.entries[keys[i]] = float(out[i])
+                evicted = 0
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    evicted += 1
+                CACHE_EVICTIONS.inc(evicted)
+            CACHE_ENTRIES.set(len(self.entries))
+        return out
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                    "hit_rate": self.hits / lookups if lookups else None}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
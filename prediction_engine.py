@@ -0,0 +1,238 @@
+import hashlib
+import os
+import re
+import threading
+
+import joblib
+import numpy as np
+
+import geocoding
+from metrics import STAGE_LATENCY, Counter, Histogram
+from prediction_cache import MAX_CACHED_BATCH, get_prediction_cache
+from model_kernel import NumpyModel
+from regional_adjustments import NO_ADJUSTMENT, get_adjustment_table
+from zip_index import STATE_NAMES, ZIP_SLOTS, get_zip_index, state_code
+
+
+# Prediction core shared by the Streamlit app, the batch tools and the HTTP service.
+
+# Feature order expected by the model
+FEATURES = ("bedrooms", "bathrooms", "livingarea", "condition", "numberofschools")
+
+# ZIP ranges outside the US
+NON_US_ZIPS = np.array([340, 962, 963, 964, 965, 966, 967, 968, 969])
+
+# Where to put the map when a ZIP cannot be located
+US_CENTER = (39.8283, -98.5795)
+
+MODEL_LOAD_SECONDS = Histogram("house_app_model_load_seconds", "Time to load a model file", ["format"])
+PREDICT_SECONDS = Histogram("house_app_predict_seconds", "Time spent in model predict calls")
+PREDICT_ROWS = Counter("house_app_predict_rows_total", "Rows scored by the model")
+ZIP_LOOKUPS = Counter("house_app_zip_lookups_total", "Single ZIP lookups by where the answer came from", ["source"])
+
+
+# Cheap staleness check for a model file: changes whenever the file is replaced or rewritten
+def model_fingerprint(model_path):
+    stat = os.stat(model_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Prefer the compiled NumPy kernel (see export_model.py) unless model.pkl was replaced after it was exported
+def default_model_path(pkl_path="model.pkl", kernel_path="model.npz"):
+    if os.path.exists(kernel_path) and (
+        not os.path.exists(pkl_path) or os.path.getmtime(kernel_path) >= os.path.getmtime(pkl_path)
+    ):
+        return kernel_path
+    return pkl_path
+
+
+# .npz artifacts are evaluated with NumPy only; anything else is a pickled estimator
+def load_model(model_path):
+    if model_path.endswith(".npz"):
+        return NumpyModel.load(model_path)
+    return joblib.load(model_path)
+
+
+def validate_zip(zip_code):
+    # Validate ZIP code format (5 digits) and restrict to USA
+    if not re.match(r"^\d{5}$", zip_code):
+        raise ValueError("ZIP code must be a 5-digit number")
+    zip_int = int(zip_code)
+    if zip_int < 501 or zip_int > 99950 or zip_int in NON_US_ZIPS:
+        raise ValueError("ZIP code must be a valid US ZIP code")
+    return zip_int
+
+
+def parse_zips(values):
+    # Vectorized validate_zip: int ZIPs, with -1 for anything invalid
+    text = np.char.strip(np.asarray(values, dtype=str))
+    well_formed = (np.char.str_len(text) == 5) & np.char.isdigit(text)
+    zips = np.full(len(text), -1, dtype=np.int64)
+    zips[well_formed] = text[well_formed].astype(np.int64)
+    in_range = (zips >= 501) & (zips <= 99950) & ~np.isin(zips, NON_US_ZIPS)
+    zips[~in_range] = -1
+    return zips
+
+
+class ZipResolver:
+    # Maps ZIPs to state codes for whole arrays at once.
+    # The offline index is used first and the network geocoder only for ZIPs the
+    # index does not know. Only real answers are remembered for the life of the
+    # process: a ZIP the geocoder could not place (not found, or a timeout/quota
+    # error) is asked again next time, which for "not found" is a geocode cache hit.
+
+    def __init__(self, locate_many=geocoding.locate_many, use_geocoder=True):
+        self.locate_many = locate_many
+        self.use_geocoder = use_geocoder
+        self.codes = np.zeros(ZIP_SLOTS, dtype=np.uint8)
+        self.resolved = np.zeros(ZIP_SLOTS, dtype=bool)
+        self.found = np.zeros(ZIP_SLOTS, dtype=bool)
+        self.lock = threading.Lock()
+        index = get_zip_index()
+        if index is not None:
+            states = np.asarray(index.table["state"])
+            self.codes[:] = states
+            self.found[:] = states != 0
+            self.resolved[:] = self.found
+
+    # The lock only guards the bookkeeping: geocoder lookups can take minutes for
+    # a large batch (about one request per second), so they run outside it and
+    # other callers are not held up. Concurrent lookups of the same ZIP share one
+    # request in the geocoding client.
+    def resolve(self, zips):
+        valid = zips >= 0
+        pending = np.unique(zips[valid])
+        pending = pending[~self.resolved[pending]]
+        if len(pending):
+            if self.use_geocoder:
+                locations = self.locate_many(f"{zip_int:05d}" for zip_int in pending)
+                with self.lock:
+                    for zip_int in pending:
+                        location = locations[f"{zip_int:05d}"]
+                        if location:
+                            self.codes[zip_int] = state_code(location[2])
+                            self.found[zip_int] = True
+                            self.resolved[zip_int] = True  # last, so readers never see a half-written entry
+            else:
+                with self.lock:
+                    self.resolved[pending] = True
+
+        codes = np.zeros(len(zips), dtype=np.uint8)
+        found = np.zeros(len(zips), dtype=bool)
+        codes[valid] = self.codes[zips[valid]]
+        found[valid] = self.found[zips[valid]]
+        return codes, found
+
+
+class PredictionEngine:
+    def __init__(self, model_path=None, locate=geocoding.locate, locate_many=geocoding.locate_many, use_geocoder=True,
+                 use_cache=True):
+        model_path = model_path or default_model_path()
+        self.model_path = model_path
+        with MODEL_LOAD_SECONDS.labels(format=os.path.splitext(model_path)[1].lstrip(".")).time():
+            self.model = load_model(model_path)
+        self.model_version = file_sha256(model_path)[:12]
+        self.locate_zip = locate
+        self.use_geocoder = use_geocoder
+        self.zip_resolver = ZipResolver(locate_many, use_geocoder)
+        self.model_metadata = None  # registry metadata when loaded from model_registry.py
+        self.shadow = None          # optional ShadowScorer fed with every predict call
+        self.cache = get_prediction_cache() if use_cache else None
+
+    # Run one dummy prediction so the first real request does not pay for lazy initialisation
+    def warm_up(self):
+        get_zip_index()
+        self.predict([[3, 2, 1500, 3, 2]], shadow=False)  # the dummy row is not traffic
+
+    # Stop background work (the shadow scorer) once the engine has been replaced
+    def close(self):
+        if self.shadow is not None:
+            self.shadow.close()
+            self.shadow = None
+
+    # Resolve a ZIP to (lat, lon, state), offline index first
+    def locate(self, zip_code):
+        with STAGE_LATENCY.labels(stage="locate").time():
+            zip_int = validate_zip(zip_code)
+            index = get_zip_index()
+            if index is not None:
+                location = index.lookup(zip_int)
+                if location:
+                    ZIP_LOOKUPS.labels(source="index").inc()
+                    return location
+            if self.use_geocoder:
+                location = self.locate_zip(zip_code)
+                if location:
+                    ZIP_LOOKUPS.labels(source="geocoder").inc()
+                    return location
+            ZIP_LOOKUPS.labels(source="not_found").inc()
+            raise ValueError("Invalid ZIP code or geocoding failed")
+
+    # (multiplier, description) for a located ZIP; the ZIP allows county/ZIP-level rules
+    def adjustment(self, state, zip_code=None):
+        zip_int = None if zip_code is None else validate_zip(zip_code)
+        return get_adjustment_table().lookup(state, zip_int)
+
+    def _predict_model(self, X):
+        with PREDICT_SECONDS.time():
+            predictions = self.model.predict(X)
+        PREDICT_ROWS.inc(len(X))
+        return np.asarray(predictions, dtype=np.float64).reshape(len(X), -1)[:, 0]
+
+    # Raw model output for a 2-D feature array, as a 1-D float array.
+    # Small batches (single requests) go through the shared prediction cache.
+    # shadow=False keeps synthetic inputs (warm-up, what-if grids) away from the shadow scorer.
+    def predict(self, X, shadow=True):
+        X = np.asarray(X, dtype=np.float64)
+        if self.cache is not None and len(X) <= MAX_CACHED_BATCH:
+            predictions = self.cache.predict(self.model_version, X, self._predict_model)
+        else:
+            predictions = self._predict_model(X)
+        if shadow and self.shadow is not None:
+            self.shadow.submit(X, predictions)
+        return predictions
+
+    # Location multiplier and state for each ZIP (state is None where it could not be resolved)
+    def locations(self, zip_codes):
+        zips = parse_zips(zip_codes)
+        codes, found = self.zip_resolver.resolve(zips)
+        multipliers = get_adjustment_table().apply(zips, codes, found)
+        states = np.array(STATE_NAMES, dtype=object)[codes]
+        states[~found] = None
+        return multipliers, states
+
+    # Score many properties at once. zip_codes may be None (no location adjustment).
+    def score(self, X, zip_codes=None):
+        X = np.asarray(X, dtype=np.float64)
+        predictions = self.predict(X)
+        predictions[X[:, 2] <= 0] = np.nan  # living area must be positive
+
+        if zip_codes is not None:
+            multipliers, states = self.locations(zip_codes)
+        else:
+            multipliers = np.full(len(X), NO_ADJUSTMENT[0])
+            states = np.full(len(X), None, dtype=object)
+        return {
+            "state": states,
+            "location_multiplier": multipliers,
+            "predicted_price": predictions,
+            "adjusted_price": predictions * multipliers,
+        }
+
+    def predict_one(self, features, zip_code=None):
+        return {key: value[0] for key, value in self.score([features], None if zip_code is None else [zip_code]).items()}
+
+
+def features_from_dict(row):
+    missing = [f for f in FEATURES if f not in row]
+    if missing:
+        raise ValueError(f"Missing features: {', '.join(missing)}")
+    return [float(row[f]) for f in FEATURES]
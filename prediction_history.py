@@ -0,0 +1,100 @@
+import importlib.util
+import io
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# Per-session prediction history.
+#
+# A fixed-capacity ring buffer of typed columns: once full, each new prediction
+# overwrites the oldest one, so memory is bounded and appending is O(1).
+# Values are stored raw (price as a float, not "$123,456.00") and only the page
+# being shown is formatted, so a rerun costs the same however long the session.
+
+HISTORY_CAPACITY = int(os.environ.get("HISTORY_CAPACITY", "1000"))
+PAGE_SIZE = 20
+
+HISTORY_DTYPE = np.dtype([
+    ("time", "f8"),
+    ("bedrooms", "i4"),
+    ("bathrooms", "f4"),
+    ("living_area", "f4"),
+    ("condition", "i1"),
+    ("schools", "i4"),
+    ("zip_code", "U10"),
+    ("predicted_price", "f8"),
+    ("location_multiplier", "f4"),
+    ("price", "f8"),
+])
+
+# Column -> (display header, formatter)
+DISPLAY_COLUMNS = {
+    "bedrooms": ("Bedrooms", "{:,.0f}"),
+    "bathrooms": ("Bathrooms", "{:g}"),
+    "living_area": ("Living Area", "{:,.0f}"),
+    "condition": ("Condition", "{:d}"),
+    "schools": ("Schools", "{:d}"),
+    "zip_code": ("ZIP Code", "{}"),
+    "price": ("Price", "${:,.2f}"),
+}
+
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+
+class PredictionHistory:
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.rows = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self.next = 0    # slot the next prediction goes into
+        self.count = 0   # predictions currently held (<= capacity)
+        self.total = 0   # predictions ever added, including overwritten ones
+
+    def __len__(self):
+        return self.count
+
+    def append(self, bedrooms, bathrooms, living_area, condition, schools, zip_code, predicted_price,
+               location_multiplier, price):
+        self.rows[self.next] = (time.time(), bedrooms, bathrooms, living_area, condition, schools, zip_code,
+                                predicted_price, location_multiplier, price)
+        self.next = (self.next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def clear(self):
+        self.next = self.count = 0
+
+    # Buffer slots holding the i-th..j-th oldest predictions
+    def _slots(self, start, stop):
+        first = (self.next - self.count) % self.capacity
+        return (first + np.arange(start, stop)) % self.capacity
+
+    def page_count(self, page_size=PAGE_SIZE):
+        return max(1, math.ceil(self.count / page_size))
+
+    # Typed rows, oldest first, optionally only the i-th..j-th oldest
+    def to_frame(self, start=0, stop=None):
+        stop = self.count if stop is None else min(stop, self.count)
+        frame = pd.DataFrame(self.rows[self._slots(start, stop)])
+        frame["time"] = pd.to_datetime(frame["time"], unit="s")
+        return frame
+
+    # One page formatted for display; page 0 holds the oldest predictions
+    def display_page(self, page, page_size=PAGE_SIZE):
+        start = page * page_size
+        rows = self.rows[self._slots(start, min(start + page_size, self.count))]
+        return pd.DataFrame(
+            {header: [fmt.format(value) for value in rows[name].tolist()] for name, (header, fmt) in DISPLAY_COLUMNS.items()},
+            index=pd.RangeIndex(start + 1, start + 1 + len(rows)),
+        )
+
+    def to_csv(self):
+        return self.to_frame().to_csv(index=False).encode()
+
+    def to_parquet(self):
+        buffer = io.BytesIO()
+        self.to_frame().to_parquet(buffer, index=False)
+        return buffer.getvalue()
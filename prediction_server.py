@@ -0,0 +1,227 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from metrics import REGISTRY, Histogram
+from model_registry import REGISTRY_DIR, RegistryWatcher, current_version, load_registry_engine
+from prediction_engine import PredictionEngine, features_from_dict, validate_zip
+
+
+# Headless JSON/HTTP prediction service.
+#
+#   GET  /health           -> {"status": "ok"}
+#   GET  /metrics          -> Prometheus text format (see metrics.py)
+#   POST /predict          -> one property: {"bedrooms": 3, ..., "zip_code": "90210"}
+#   POST /predict/batch    -> {"properties": [{...}, {...}]}; each result has an "error"
+#                             (null, or why the row has no price / location adjustment)
+#
+# Single requests that arrive close together are grouped by MicroBatcher and
+# scored with one vectorized predict call. When serving from the model registry,
+# a newly promoted version is loaded in the background and swapped in.
+
+REQUEST_SECONDS = Histogram("house_app_http_request_seconds", "Prediction service request latency", ["route", "status"])
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_batch_size=256, max_wait=0.005):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.worker.start()
+
+    # Queue one feature row and wait for its prediction
+    def submit(self, features, timeout=None):
+        future = Future()
+        self.requests.put((features, future))
+        return future.result(timeout)
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                predictions = self.predict(np.array([features for features, _ in batch], dtype=np.float64))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(float(prediction))
+
+
+def to_json_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+# The 400 message /predict would give for this row, or None
+def row_error(features, zip_code):
+    if features[2] <= 0:
+        return "Living area must be greater than 0"
+    if zip_code is not None:
+        try:
+            validate_zip(str(zip_code))
+        except ValueError as e:
+            return str(e)
+    return None
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    engine = None
+    batcher = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            metadata = self.engine.model_metadata or {}
+            self.send_json(200, {"status": "ok", "model": self.engine.model_path,
+                                 "version": metadata.get("version"), "sha256": self.engine.model_version})
+        elif self.path == "/metrics":
+            data = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/predict":
+                self.send_json(200, self.predict_single(body))
+            elif self.path == "/predict/batch":
+                self.send_json(200, self.predict_batch(body))
+            else:
+                self.send_json(404, {"error": "Not found"})
+        except (ValueError, TypeError, KeyError) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": f"Prediction failed: {str(e)}"})
+        route = self.path if self.path in ("/predict", "/predict/batch") else "other"
+        REQUEST_SECONDS.labels(route=route, status=self.status).observe(time.perf_counter() - start)
+
+    def predict_single(self, body):
+        features = features_from_dict(body)
+        if features[2] <= 0:
+            raise ValueError("Living area must be greater than 0")
+        zip_code = body.get("zip_code")
+        multiplier, state = 1.0, None
+        if zip_code is not None:
+            validate_zip(str(zip_code))  # same 400 as the app for malformed or non-US ZIPs
+            multipliers, states = self.engine.locations([zip_code])
+            multiplier, state = float(multipliers[0]), states[0]
+        prediction = self.batcher.submit(features)
+        return {
+            "state": state,
+            "location_multiplier": multiplier,
+            "predicted_price": to_json_value(prediction),
+            "adjusted_price": to_json_value(prediction * multiplier),
+        }
+
+    def predict_batch(self, body):
+        properties = body.get("properties")
+        if not isinstance(properties, list):
+            raise ValueError("'properties' must be a list")
+        if not properties:
+            return {"predictions": []}
+        X = [features_from_dict(row) for row in properties]
+        zip_codes = [row.get("zip_code") for row in properties]
+        scores = self.engine.score(X, zip_codes if any(z is not None for z in zip_codes) else None)
+        predictions = [
+            {key: to_json_value(values[i]) for key, values in scores.items()}
+            for i in range(len(properties))
+        ]
+        # Rows are still scored, but say why a row got no price or no location adjustment
+        for prediction, features, zip_code in zip(predictions, X, zip_codes):
+            prediction["error"] = row_error(features, zip_code)
+        return {"predictions": predictions}
+
+    def send_json(self, status, payload):
+        self.status = status
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_server(engine, host="127.0.0.1", port=8000, max_batch_size=256, max_wait=0.005):
+    handler = type("Handler", (PredictionHandler,), {"engine": engine})
+    # Look the engine up per batch so swap_engine() takes effect without a restart
+    handler.batcher = MicroBatcher(lambda X: handler.engine.predict(X), max_batch_size, max_wait)
+    server = PredictionServer((host, port), handler)
+    server.handler = handler
+    return server
+
+
+# Replace the serving engine; requests already running finish on the old one
+def swap_engine(server, engine):
+    old, server.handler.engine = server.handler.engine, engine
+    old.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve house price predictions over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", help="Model file (.pkl or exported .npz); defaults to the registry's current version, "
+                                        "else model.npz if it is up to date, else model.pkl")
+    parser.add_argument("--registry", default=REGISTRY_DIR, help="Model registry directory")
+    parser.add_argument("--watch-interval", type=float, default=5.0,
+                        help="Seconds between checks for a newly promoted registry version")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="How long to wait for more requests before scoring a batch")
+    parser.add_argument("--no-geocoder", action="store_true", help="Only use the offline ZIP index")
+    args = parser.parse_args()
+
+    use_registry = args.model is None and current_version(args.registry) is not None
+    if use_registry:
+        engine = load_registry_engine(args.registry, use_geocoder=not args.no_geocoder)
+    else:
+        engine = PredictionEngine(args.model, use_geocoder=not args.no_geocoder)
+    engine.warm_up()
+    server = make_server(engine, args.host, args.port, args.max_batch_size, args.max_wait_ms / 1000)
+    if use_registry:
+        RegistryWatcher(lambda new: swap_engine(server, new), args.registry, args.watch_interval,
+                        use_geocoder=not args.no_geocoder)
+    print(f"Serving predictions on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from zip_index import STATE_NAMES, ZIP_SLOTS, state_code
+
+
+# Location price adjustments, loaded from regional_adjustments.csv.
+#
+# Each row applies a multiplier to a region at one of these levels (most specific wins):
+#   zip      region = a ZIP prefix of 1-5 digits ("07", "070", "07030"); longer prefixes win
+#   county   region = county name, with its state in the state column; needs a ZIP -> county
+#            crosswalk CSV (zip, county, state), e.g. HUD's USPS ZIP-county file
+#   state    region = state name
+#   default  any known state without a state row
+# ZIPs that cannot be located get NO_ADJUSTMENT.
+#
+# Loading the table resolves every rule into a dense per-ZIP and per-state index,
+# so adjusting an array of predictions is a few array lookups. The file is checked
+# for changes at most once every RELOAD_INTERVAL seconds and reloaded in place.
+
+ADJUSTMENTS_PATH = os.environ.get("REGIONAL_ADJUSTMENTS_PATH", "regional_adjustments.csv")
+COUNTY_CROSSWALK_PATH = os.environ.get("ZIP_COUNTY_CROSSWALK_PATH", os.path.join("data", "zip_county.csv"))
+RELOAD_INTERVAL = 5.0
+
+LEVELS = ("zip", "county", "state", "default")
+
+TABLE_DTYPES = {
+    "level": str, "region": str, "state": str, "multiplier": np.float64,
+    "description": str, "note": str, "source": str, "source_date": str,
+}
+
+# Used for known states when the table has no default row
+DEFAULT_ADJUSTMENT = (1.03, "+3% (General market)")
+
+# Used when the ZIP could not be resolved at all
+NO_ADJUSTMENT = (1.0, "None (location unavailable)")
+
+logger = logging.getLogger(__name__)
+
+
+def _county_key(name):
+    name = str(name).strip().casefold()
+    for suffix in (" county", " parish", " borough", " census area", " municipality"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+# ZIP -> county key for every ZIP in the crosswalk, keyed by (state code, county key)
+def load_county_crosswalk(path=COUNTY_CROSSWALK_PATH):
+    frame = pd.read_csv(path, dtype=str)
+    lowered = {c.lower().strip(): c for c in frame.columns}
+    columns = {}
+    for key, aliases in {"zip": ["zip", "zipcode", "zip_code"], "county": ["county", "county_name", "countyname"],
+                         "state": ["state", "state_name", "state_id", "usps_zip_pref_state"]}.items():
+        column = next((lowered[a] for a in aliases if a in lowered), None)
+        if column is None:
+            raise ValueError(f"No {key} column found in {path} (expected one of {aliases})")
+        columns[key] = column
+    frame = frame[list(columns.values())].dropna()
+    zips = pd.to_numeric(frame[columns["zip"]].str.strip().str.zfill(5), errors="coerce")
+    frame, zips = frame[zips.notna()], zips[zips.notna()].astype(np.int64)
+    crosswalk = {}
+    for zip_int, county, state in zip(zips, frame[columns["county"]], frame[columns["state"]]):
+        if 0 <= zip_int < ZIP_SLOTS:
+            crosswalk.setdefault((state_code(state), _county_key(county)), []).append(zip_int)
+    return {key: np.array(values, dtype=np.int64) for key, values in crosswalk.items()}
+
+
+class AdjustmentTable:
+    def __init__(self, rules, crosswalk=None):
+        # Rule 0 is NO_ADJUSTMENT; table rows follow in file order
+        rules = rules.reset_index(drop=True)
+        self.rules = rules
+        self.multipliers = np.concatenate([[NO_ADJUSTMENT[0]], rules["multiplier"].to_numpy(dtype=np.float64)])
+        self.descriptions = np.array([NO_ADJUSTMENT[1]] + rules["description"].tolist(), dtype=object)
+
+        levels = rules["level"].to_numpy()
+        defaults = np.flatnonzero(levels == "default")
+        if len(defaults):
+            default_rule = defaults[-1] + 1
+        else:
+            # Append the built-in default so known states always get a multiplier
+            default_rule = len(self.multipliers)
+            self.multipliers = np.append(self.multipliers, DEFAULT_ADJUSTMENT[0])
+            self.descriptions = np.append(self.descriptions, DEFAULT_ADJUSTMENT[1])
+
+        # Per state code; code 0 is a located ZIP whose state name was not recognised
+        self.state_rule = np.full(len(STATE_NAMES), default_rule, dtype=np.int32)
+        for i in np.flatnonzero(levels == "state"):
+            code = state_code(rules.at[i, "region"])
+            if code == 0:
+                raise ValueError(f"Unknown state '{rules.at[i, 'region']}' in adjustment table")
+            self.state_rule[code] = i + 1
+
+        # Per ZIP, -1 where the state rule applies. Counties first, then prefixes from short to long.
+        self.zip_rule = np.full(ZIP_SLOTS, -1, dtype=np.int32)
+        self.unmatched_counties = 0
+        for i in np.flatnonzero(levels == "county"):
+            zips = (crosswalk or {}).get((state_code(rules.at[i, "state"]), _county_key(rules.at[i, "region"])))
+            if zips is None:
+                self.unmatched_counties += 1
+                continue
+            self.zip_rule[zips] = i + 1
+        zip_rows = np.flatnonzero(levels == "zip")
+        for i in sorted(zip_rows, key=lambda i: len(rules.at[i, "region"])):
+            prefix = rules.at[i, "region"]
+            width = 10 ** (5 - len(prefix))
+            self.zip_rule[int(prefix) * width:(int(prefix) + 1) * width] = i + 1
+        if self.unmatched_counties:
+            logger.warning("%d county adjustments have no ZIPs in the crosswalk and are not applied", self.unmatched_counties)
+        for array in (self.multipliers, self.zip_rule, self.state_rule):
+            array.setflags(write=False)
+
+    @classmethod
+    def load(cls, path=ADJUSTMENTS_PATH, crosswalk_path=COUNTY_CROSSWALK_PATH):
+        rules = pd.read_csv(path, dtype=TABLE_DTYPES, keep_default_na=False)
+        missing = {"level", "region", "multiplier", "description"} - set(rules.columns)
+        if missing:
+            raise ValueError(f"Adjustment table {path} is missing columns: {', '.join(sorted(missing))}")
+        for column in TABLE_DTYPES:
+            if column not in rules.columns:
+                rules[column] = ""
+        rules["level"] = rules["level"].str.strip().str.lower()
+        rules["region"] = rules["region"].str.strip()
+        bad_levels = set(rules["level"]) - set(LEVELS)
+        if bad_levels:
+            raise ValueError(f"Unknown adjustment level(s): {', '.join(sorted(bad_levels))}")
+        zip_regions = rules.loc[rules["level"] == "zip", "region"]
+        if not zip_regions.str.fullmatch(r"\d{1,5}").all():
+            raise ValueError("ZIP adjustments need a region of 1-5 digits")
+        if not np.all(rules["multiplier"] > 0):
+            raise ValueError("Adjustment multipliers must be positive")
+        rules["source_date"] = pd.to_datetime(rules["source_date"].where(rules["source_date"] != ""), errors="raise").dt.date
+
+        crosswalk = None
+        if (rules["level"] == "county").any() and crosswalk_path and os.path.exists(crosswalk_path):
+            crosswalk = load_county_crosswalk(crosswalk_path)
+        return cls(rules, crosswalk)
+
+    # Rule index per location: zips are ints (-1 if invalid), state codes from zip_index, found = located at all
+    def rule_indices(self, zips, state_codes, found):
+        zips = np.asarray(zips)
+        rules = np.zeros(len(zips), dtype=np.int32)
+        valid = zips >= 0
+        rules[valid] = self.zip_rule[zips[valid]]
+        use_state = (rules < 0) | ~valid
+        rules[use_state] = self.state_rule[np.asarray(state_codes)[use_state]]
+        rules[~np.asarray(found)] = 0
+        return rules
+
+    # Multiplier per location, for whole arrays at once
+    def apply(self, zips, state_codes, found):
+        return self.multipliers[self.rule_indices(zips, state_codes, found)]
+
+    # (multiplier, description) for one located ZIP
+    def lookup(self, state, zip_int=None):
+        rule = self.rule_indices(np.array([-1 if zip_int is None else zip_int]), np.array([state_code(state)]), np.array([True]))[0]
+        return float(self.multipliers[rule]), self.descriptions[rule]
+
+
+_table = None
+_table_path = None
+_table_mtime = None
+_checked = 0.0
+_table_lock = threading.Lock()
+
+
+# The loaded table, reloaded when the file changes; a broken edit keeps the previous table
+def get_adjustment_table(path=ADJUSTMENTS_PATH):
+    global _table, _table_path, _table_mtime, _checked
+    now = time.monotonic()
+    if _table is not None and path == _table_path and now - _checked < RELOAD_INTERVAL:
+        return _table
+    with _table_lock:
+        _checked = now
+        mtime = os.stat(path).st_mtime_ns
+        if _table is None or path != _table_path or mtime != _table_mtime:
+            try:
+                _table = AdjustmentTable.load(path)
+                _table_path, _table_mtime = path, mtime
+            except Exception:
+                if _table is None or path != _table_path:
+                    raise
+                logger.exception("Could not reload %s; keeping the previous adjustments", path)
+                _table_mtime = mtime
+    return _table
@@ -0,0 +1,90 @@
+import numpy as np
+
+from prediction_engine import FEATURES
+
+
+# What-if grids around the current inputs.
+#
+# Every combination of neighbouring feature values is scored in one vectorized
+# predict call. Nearby prices, heatmaps and sensitivity curves are then looked up
+# in the grid, so exploring never calls the model again.
+
+# Steps tried on each side of the current value
+STEPS = {
+    "bedrooms": np.arange(-2, 3),
+    "bathrooms": np.arange(-2, 3),
+    "livingarea": np.linspace(-0.4, 0.4, 9),  # relative to the current living area
+    "condition": None,                        # always the full 1-5 scale
+    "numberofschools": np.arange(-2, 3),
+}
+
+LABELS = {
+    "bedrooms": "Bedrooms",
+    "bathrooms": "Bathrooms",
+    "livingarea": "Living Area",
+    "condition": "Condition",
+    "numberofschools": "Schools",
+}
+
+
+# Grid values for each feature, centred on (and always including) the current inputs
+def feature_axes(features):
+    bedrooms, bathrooms, livingarea, condition, schools = (float(v) for v in features)
+    if livingarea <= 0:
+        raise ValueError("Living area must be greater than 0")
+    axes = {
+        "bedrooms": bedrooms + STEPS["bedrooms"],
+        "bathrooms": bathrooms + STEPS["bathrooms"],
+        "livingarea": np.round(livingarea * (1 + STEPS["livingarea"])),
+        "condition": np.arange(1, 6, dtype=np.float64),
+        "numberofschools": schools + STEPS["numberofschools"],
+    }
+    axes["livingarea"] = np.append(axes["livingarea"], livingarea)
+    axes["livingarea"] = axes["livingarea"][axes["livingarea"] > 0]
+    return {name: np.unique(values[values >= 0]) for name, values in axes.items()}
+
+
+class SensitivityGrid:
+    def __init__(self, axes, prices, center):
+        self.axes = axes
+        self.prices = prices  # one dimension per feature, in FEATURES order
+        self.center = center
+
+    def _index(self, name, value):
+        i = int(np.searchsorted(self.axes[name], value))
+        if i == len(self.axes[name]) or self.axes[name][i] != value:
+            raise KeyError(f"{LABELS[name]} {value:g} is not on the grid")
+        return i
+
+    # Adjusted price for any combination of grid values; unspecified features stay at the current inputs
+    def price(self, **values):
+        point = {**self.center, **values}
+        return float(self.prices[tuple(self._index(name, point[name]) for name in FEATURES)])
+
+    # Prices along one feature with the others held at the current inputs
+    def curve(self, name):
+        index = tuple(slice(None) if other == name else self._index(other, self.center[other]) for other in FEATURES)
+        return self.axes[name], self.prices[index]
+
+    # Partial dependence: prices along one feature averaged over the rest of the grid
+    def partial_dependence(self, name):
+        axis = FEATURES.index(name)
+        return self.axes[name], self.prices.mean(axis=tuple(i for i in range(len(FEATURES)) if i != axis))
+
+    # 2-D slice (rows x columns) with the other features held at the current inputs
+    def heatmap(self, rows, columns):
+        index = tuple(
+            slice(None) if name in (rows, columns) else self._index(name, self.center[name]) for name in FEATURES
+        )
+        prices = self.prices[index]
+        return prices if FEATURES.index(rows) < FEATURES.index(columns) else prices.T
+
+
+def build_grid(engine, features, location_multiplier=1.0):
+    axes = feature_axes(features)
+    mesh = np.meshgrid(*(axes[name] for name in FEATURES), indexing="ij")
+    X = np.column_stack([values.ravel() for values in mesh])
+    # Grid points are not real requests, so the shadow model does not score them
+    prices = engine.predict(X, shadow=False).reshape(mesh[0].shape) * location_multiplier
+    center = {name: float(value) for name, value in zip(FEATURES, features)}
+    return SensitivityGrid(axes, prices, center)
@@ -1,12 +1,17 @@
 import streamlit as st
-import joblib
 import numpy as np
 import pandas as pd
-from streamlit_folium import folium_static
-import folium
-from geopy.geocoders import Nominatim
+import altair as alt
 from geopy.exc import GeocoderTimedOut, GeocoderQuotaExceeded
-import re
+import os
+import tempfile
+import batch_predict
+from prediction_engine import FEATURES, PredictionEngine, default_model_path, model_fingerprint
+from sensitivity import LABELS, build_grid
+from map_render import show_fallback_map, show_map
+from model_registry import ShadowScorer, current_model_path, list_versions, load_metadata, shadow_model_path
+from prediction_history import PARQUET_AVAILABLE, PredictionHistory
+from metrics import LOCATION_FALLBACKS, LOCATION_REQUESTS, METRICS_PORT, STAGE_LATENCY, start_metrics_server
 
 # Define colors and styles at the top
 bg_gradient = "linear-gradient(-45deg, #1a1a1a, #2e2e2e, #3d3d3d, #4a4a4a)"  # Dark gradient to maintain black theme
@@ -19,38 +24,53 @@ plus_color = "#00cc00"  # Explicit green for plus sign
 
 # Initialize session state for prediction history and last ZIP code
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = PredictionHistory()
 if 'last_zip' not in st.session_state:
     st.session_state.last_zip = None
 if 'last_location_data' not in st.session_state:
     st.session_state.last_location_data = None
 
 
-# Load model
-model = joblib.load("model.pkl")
+# Use the network geocoder only for ZIPs missing from the offline index
+GEOCODER_FALLBACK = os.environ.get("ZIP_GEOCODER_FALLBACK", "1") != "0"
 
 
-# Cache geocoding results
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def geocode_zip(zip_code):
-    try:
-        geolocator = Nominatim(user_agent="house_price_app")
-        location = geolocator.geocode(f"{zip_code}, USA", timeout=10)
-        if location:
-            return location.latitude, location.longitude
-        return None
-    except (GeocoderTimedOut, GeocoderQuotaExceeded) as e:
-        return None
+# Re-read on every rerun, so promoting a registry version swaps the model without a restart
+MODEL_PATH = os.environ.get("MODEL_PATH") or current_model_path() or default_model_path()
+SHADOW_MODEL_PATH = None if os.environ.get("MODEL_PATH") else shadow_model_path()
 
 
-@st.cache_data(ttl=3600)  # Cache for 1 hour
-def reverse_geocode(lat, lon):
-    try:
-        geolocator = Nominatim(user_agent="house_price_app")
-        address = geolocator.reverse((lat, lon), language='en', timeout=10).raw['address']
-        return address.get('state', 'Unknown')
-    except (GeocoderTimedOut, GeocoderQuotaExceeded) as e:
-        return 'Unknown'
+# Load model once per process; a new fingerprint (model replaced or promoted) loads it again.
+# Sessions mid-rerun keep the previous engine, so a swap never interrupts a prediction.
+# Evicted engines (model or shadow changed) stop their shadow scorer thread
+@st.cache_resource(max_entries=1, on_release=lambda engine: engine.close())
+def load_engine(model_path, fingerprint, shadow_path):
+    engine = PredictionEngine(model_path, use_geocoder=GEOCODER_FALLBACK)
+    version = os.path.basename(os.path.dirname(model_path))
+    if version in list_versions():
+        engine.model_metadata = load_metadata(version)
+    if shadow_path and shadow_path != model_path:
+        engine.shadow = ShadowScorer(shadow_path)
+    engine.warm_up()
+    return engine
+
+
+engine = load_engine(MODEL_PATH, model_fingerprint(MODEL_PATH), SHADOW_MODEL_PATH)
+
+
+# Prometheus metrics on http://127.0.0.1:$METRICS_PORT/metrics (set METRICS_PORT=0 to disable)
+@st.cache_resource
+def metrics_endpoint():
+    return start_metrics_server() if METRICS_PORT else None
+
+
+metrics_endpoint()
+
+
+# One vectorized predict call per (model, inputs, location); what-if tweaks only index into the grid
+@st.cache_data(max_entries=64)
+def what_if_grid(_engine, model_version, features, location_multiplier):
+    return build_grid(_engine, features, location_multiplier)
 
 
 # ------------------- App Styling -----------------------
@@ -264,97 +284,26 @@ with st.container():
 
 # ------------------- Location-Based Feature -----------------------
 st.subheader("🗺 Location Context")
+# Static tiles skip the Leaflet JS/CSS payload for slow connections
+static_map = st.toggle("Low-bandwidth map", value=os.environ.get("MAP_STATIC", "0") == "1", key="static_map")
+LOCATION_REQUESTS.inc()
 try:
-    # Validate ZIP code format (5 digits) and restrict to USA
-    if not re.match(r"^\d{5}$", zip_code):
-        raise ValueError("ZIP code must be a 5-digit number")
-    # Check if ZIP is within valid US range (e.g., 00501-99950, excluding non-US)
-    zip_int = int(zip_code)
-    if zip_int < 501 or zip_int > 99950 or zip_int in [340, 962, 963, 964, 965, 966, 967, 968, 969]:  # Exclude non-US ZIP ranges
-        raise ValueError("ZIP code must be a valid US ZIP code")
-
-
     # Check if ZIP code changed or no cached data
     if zip_code != st.session_state.last_zip or st.session_state.last_location_data is None:
-        location_data = geocode_zip(zip_code)
-        if location_data:
-            lat, lon = location_data
-            state = reverse_geocode(lat, lon)
-            st.session_state.last_location_data = (lat, lon, state)
-            st.session_state.last_zip = zip_code
-        else:
-            raise ValueError("Invalid ZIP code or geocoding failed")
+        # Validates the ZIP (5 digits, US range) and resolves it, raising ValueError on failure
+        lat, lon, state = engine.locate(zip_code)
+        st.session_state.last_location_data = (lat, lon, state)
+        st.session_state.last_zip = zip_code
     else:
         lat, lon, state = st.session_state.last_location_data
 
 
-    
-    #State-specific price adjustments
-    state_adjustments = {    
-   'Alabama': (1.03, "+3% (Moderate growth, low property taxes at 0.38%)"),  # Low taxes, affordable market[](https://www.propertyshark.com/info/property-taxes-by-state/)
-    'Alaska': (1.02, "+2% (Stable, remote market with high costs)"),  # Stable but high living costs
-    'Arizona': (0.98, "-2% (Oversupply, high risk of price decline)"),  # High risk of price drops[](https://www.cotality.com/insights/articles/us-home-price-insights-march-2025)
-    'Arkansas': (1.03, "+3% (Moderate growth, low-cost Midwest)"),  # Affordable, stable growth
-    'California': (1.03, "+3% (High demand, affordability issues, 7% mortgage rates)"),  # High costs, locked-in homeowners[](https://lao.ca.gov/LAOEconTax/Article/Detail/793)
-    'Colorado': (1.03, "+3% (Stable, tech-driven, moderating prices)"),  # Cooling after boom[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'Connecticut': (1.06, "+6% (Northeast strength, high property taxes at 1.81%)"),  # Strong market, high taxes[](https://taxfoundation.org/data/all/state/property-taxes-by-state-county/)
-    'Delaware': (1.05, "+5% (Moderate growth, urban proximity)"),  # Steady demand
-    'Florida': (0.99, "-1% (Oversupply in some markets, high insurance costs)"),  # Risk of price decline[](https://www.cotality.com/insights/articles/us-home-price-insights-march-2025)
-    'Georgia': (1.05, "+5% (Sunbelt growth, strong job market)"),  # Hot market, population growth[](https://raleighrealty.com/blog/least-and-most-affordable-states)
-    'Hawaii': (0.97, "-3% (Price decline, high home values at $843,723)"),  # Declining prices, high taxes[](https://www.fool.com/money/research/average-house-price-state/)
-    'Idaho': (1.02, "+2% (Cooling after boom, high prices at $466,435)"),  # Post-boom correction[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'Illinois': (1.04, "+4% (Moderate growth, high property taxes at 2.11%)"),  # Urban-driven, high taxes[](https://taxfoundation.org/data/all/state/property-taxes-by-state-county/)
-    'Indiana': (1.05, "+5% (Midwest growth, affordable homes)"),  # Strong appreciation potential[](https://realwealth.com/learn/housing-market-predictions/)
-    'Iowa': (1.03, "+3% (Stable, low-cost market)"),  # Steady, affordable
-    'Kansas': (1.03, "+3% (Stable, agricultural market)"),  # Moderate growth
-    'Kentucky': (1.04, "+4% (Moderate growth, affordable housing)"),  # Stable, low-cost
-    'Louisiana': (1.02, "+2% (Slower growth, hurricane risks)"),  # Slower market, natural disaster impacts
-    'Maine': (1.06, "+6% (Northeast strength, high demand)"),  # Strong regional market
-    'Maryland': (1.05, "+5% (High home values at $634,548, urban proximity)"),  # Expensive but stable[](https://www.fool.com/money/research/average-house-price-state/)
-    'Massachusetts': (1.06, "+6% (High home values at $247,917, strong market)"),  # Costly, low affordability[](https://www.fool.com/money/research/average-house-price-state/)
-    'Michigan': (1.05, "+5% (Affordable homes at $337,608, Detroit growth)"),  # Strong Midwest market[](https://www.fool.com/money/research/average-house-price-state/)
-    'Minnesota': (1.04, "+4% (Stable, good income-to-home-value ratio)"),  # Balanced market[](https://www.fool.com/money/research/average-house-price-state/)
-    'Mississippi': (1.02, "+2% (Slower growth, low-cost housing)"),  # Affordable, slow market
-    'Missouri': (1.03, "+3% (Moderate growth, affordable Midwest)"),  # Stable, low-cost
-    'Montana': (1.02, "+2% (Cooling after boom, rural market)"),  # Post-boom stabilization
-    'Nebraska': (1.04, "+4% (Stable, strong ROI potential)"),  # Affordable, investment-friendly[](https://raleighrealty.com/blog/least-and-most-affordable-states)
-    'Nevada': (1.05, "+5% (Sunbelt, Vegas-driven growth)"),  # Strong demand, urban centers
-    'New Hampshire': (1.06, "+6% (Northeast strength, high property taxes)"),  # Strong market, high taxes[](https://taxfoundation.org/data/all/state/property-taxes-by-state-county/)
-    'New Jersey': (1.07, "+7% (High demand, highest property taxes at 2.23%)"),  # Expensive, urban-driven[](https://www.propertyshark.com/info/property-taxes-by-state/)
-    'New Mexico': (1.02, "+2% (Moderate growth, high risk of price decline)"),  # Cooling market[](https://www.cotality.com/insights/articles/us-home-price-insights-february-2025)
-    'New York': (1.05, "+5% (Strong urban markets, high taxes)"),  # Variable but strong[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'North Carolina': (1.06, "+6% (Hot market, Raleigh growth, strong ROI)"),  # High demand, population growth[](https://raleighrealty.com/blog/least-and-most-affordable-states)
-    'North Dakota': (1.02, "+2% (Slower growth, stable economy)"),  # Slow but steady
-    'Ohio': (1.05, "+5% (Midwest growth, affordable markets)"),  # Strong appreciation potential[](https://realwealth.com/learn/housing-market-predictions/)
-    'Oklahoma': (1.03, "+3% (Moderate growth, low-cost housing)"),  # Affordable, stable
-    'Oregon': (1.02, "+2% (Cooling, high prices at $502,215)"),  # Affordability constraints[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'Pennsylvania': (1.05, "+5% (Moderate urban growth, stable market)"),  # Steady demand
-    'Rhode Island': (1.08, "+8% (High price appreciation, small inventory)"),  # Strong Northeast market
-    'South Carolina': (1.06, "+6% (Sunbelt, Charleston-driven growth)"),  # Hot market, coastal demand
-    'South Dakota': (1.03, "+3% (Stable, rural market)"),  # Moderate growth
-    'Tennessee': (1.05, "+5% (Sunbelt, Nashville growth, strong ROI)"),  # High demand, investment-friendly[](https://realwealth.com/learn/housing-market-predictions/)
-    'Texas': (0.99, "+1% (Oversupply, price fluctations expected)"),  # High inventory, price drops[](https://www.newsweek.com/texas-faces-major-housing-market-correction-prices-drop-across-state-2070190)
-    'Utah': (1.02, "+2% (Cooling after boom, high prices at $544,868)"),  # Post-boom correction[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'Vermont': (1.08, "+8% (High price appreciation, low inventory)"),  # Strong Northeast market
-    'Virginia': (1.05, "+5% (Stable, urban proximity, strong job market)"),  # Steady demand
-    'Washington': (1.03, "+3% (Stable, tech-driven, high prices at $595,723)"),  # Cooling, high costs[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-    'West Virginia': (1.07, "+7% (High appreciation, lowest prices at $146,578)"),  # Affordable, high growth[](https://raleighrealty.com/blog/least-and-most-affordable-states)
-    'Wisconsin': (1.05, "+5% (Midwest growth, stable market)"),  # Strong, affordable
-    'Wyoming': (1.02, "+2% (Slower growth, rural market)"),  # Stable, low demand
-    'District of Columbia': (0.97, "-3% (Price decline, high costs at $701,895)"),  # Declining prices, low homeownership[](https://worldpopulationreview.com/state-rankings/median-home-price-by-state)
-}
-
-
-    if state in state_adjustments:
-        location_multiplier, adjustment_text = state_adjustments[state]
-    else:
-        location_multiplier = 1.03  # Default for unknown states
-        adjustment_text = "+3% (General market)"
+
+    location_multiplier, adjustment_text = engine.adjustment(state, zip_code)
    
     # Render map
-    m = folium.Map(location=[lat, lon], zoom_start=10)
-    folium.Marker([lat, lon], popup=f"ZIP: {zip_code}", tooltip="Estimated Location").add_to(m)
-    folium_static(m, width=700, height=300)
+    with STAGE_LATENCY.labels(stage="render_map").time():
+        show_map(lat, lon, popup=f"ZIP: {zip_code}", tooltip="Estimated Location", static=static_map)
    
     # Display adjustment
     st.write(f"Location adjustment for ZIP {zip_code}: {adjustment_text}")
@@ -365,39 +314,35 @@ try:
 
 except ValueError as ve:
     # Handle invalid ZIP format or non-US ZIP codes
+    LOCATION_FALLBACKS.labels(reason="invalid_zip").inc()
     lat, lon = 39.8283, -98.5795
     location_multiplier = 1.0
     st.error(f"Error: {str(ve)}. Using default US center location.")
-    m = folium.Map(location=[lat, lon], zoom_start=10)
-    folium.Marker([lat, lon], popup="Default Location", tooltip="US Center").add_to(m)
-    folium_static(m, width=700, height=300)
+    show_fallback_map(static=static_map)
     st.markdown("Map data © [OpenStreetMap](https://www.openstreetmap.org/copyright) contributors", unsafe_allow_html=True)
 except GeocoderTimedOut:
     # Handle API timeout
+    LOCATION_FALLBACKS.labels(reason="timeout").inc()
     lat, lon = 39.8283, -98.5795
     location_multiplier = 1.0
     st.error("Geocoding timed out. Please try again later. Using default US center location.")
-    m = folium.Map(location=[lat, lon], zoom_start=10)
-    folium.Marker([lat, lon], popup="Default Location", tooltip="US Center").add_to(m)
-    folium_static(m, width=700, height=300)
+    show_fallback_map(static=static_map)
     st.markdown("Map data © [OpenStreetMap](https://www.openstreetmap.org/copyright) contributors", unsafe_allow_html=True)
 except GeocoderQuotaExceeded:
     # Handle API rate limit
+    LOCATION_FALLBACKS.labels(reason="quota").inc()
     lat, lon = 39.8283, -98.5795
     location_multiplier = 1.0
     st.error("API rate limit exceeded. Please wait a moment and try again. Using default US center location.")
-    m = folium.Map(location=[lat, lon], zoom_start=10)
-    folium.Marker([lat, lon], popup="Default Location", tooltip="US Center").add_to(m)
-    folium_static(m, width=700, height=300)
+    show_fallback_map(static=static_map)
     st.markdown("Map data © [OpenStreetMap](https://www.openstreetmap.org/copyright) contributors", unsafe_allow_html=True)
 except Exception as e:
     # Handle other errors
+    LOCATION_FALLBACKS.labels(reason="error").inc()
     lat, lon = 39.8283, -98.5795
     location_multiplier = 1.0
     st.error(f"Map rendering or geocoding failed: {str(e)}. Using default US center location.")
-    m = folium.Map(location=[lat, lon], zoom_start=10)
-    folium.Marker([lat, lon], popup="Default Location", tooltip="US Center").add_to(m)
-    folium_static(m, width=700, height=300)
+    show_fallback_map(static=static_map)
     st.markdown("Map data © [OpenStreetMap](https://www.openstreetmap.org/copyright) contributors", unsafe_allow_html=True)
 
 
@@ -412,32 +357,104 @@ if predictbutton:
     else:
         X = np.array([[bedrooms, bathrooms, livingarea, condition, numberofschools]])
         try:
-            prediction = model.predict(X)[0][0]
+            with STAGE_LATENCY.labels(stage="predict").time():
+                prediction = engine.predict(X)[0]
             adjusted_prediction = prediction * location_multiplier  # Apply location adjustment
            
             # Store prediction in history
-            st.session_state.history.append({
-                'Bedrooms': bedrooms,
-                'Bathrooms': bathrooms,
-                'Living Area': livingarea,
-                'Condition': condition,
-                'Schools': numberofschools,
-                'ZIP Code': zip_code,
-                'Price': f"${adjusted_prediction:,.2f}"
-            })
+            st.session_state.history.append(
+                bedrooms, bathrooms, livingarea, condition, numberofschools, zip_code,
+                predicted_price=prediction, location_multiplier=location_multiplier, price=adjusted_prediction,
+            )
            
             st.balloons()
             st.success(f"🏠 Estimated House Price: **${adjusted_prediction:,.2f}**")
+            served_by = (engine.model_metadata or {}).get("version") or os.path.basename(engine.model_path)
+            st.caption(f"Model {served_by} ({engine.model_version})")
         except Exception as e:
             st.error(f"Prediction failed: {str(e)}")
 else:
     st.info("👈 Enter values above and click **Predict House Price**.")
 
 
+# ------------------- What-if Sensitivity -----------------------
+with st.expander("🎛 What-if Sensitivity"):
+    if livingarea <= 0:
+        st.info("Enter a living area greater than 0 to explore nearby prices.")
+    else:
+        grid = what_if_grid(engine, engine.model_version, (bedrooms, bathrooms, livingarea, condition, numberofschools),
+                            float(location_multiplier))
+        slider_columns = st.columns(len(FEATURES))
+        what_if = {
+            name: slider_columns[i].select_slider(LABELS[name], options=grid.axes[name].tolist(), value=grid.center[name],
+                                                  format_func=lambda v: f"{v:,.0f}" if v >= 100 else f"{v:g}")
+            for i, name in enumerate(FEATURES)
+        }
+        base_price = grid.price()
+        what_if_price = grid.price(**what_if)
+        st.metric("What-if price", f"${what_if_price:,.2f}", delta=f"{what_if_price - base_price:+,.2f} vs. current inputs")
+
+        heatmap_columns = st.columns(2)
+        rows = heatmap_columns[0].selectbox("Heatmap rows", FEATURES, index=FEATURES.index("livingarea"), format_func=LABELS.get)
+        columns = heatmap_columns[1].selectbox("Heatmap columns", FEATURES, index=FEATURES.index("bedrooms"), format_func=LABELS.get)
+        if rows == columns:
+            st.warning("Pick two different features for the heatmap.")
+        else:
+            prices = grid.heatmap(rows, columns)
+            r, c = np.meshgrid(grid.axes[rows], grid.axes[columns], indexing="ij")
+            cells = pd.DataFrame({LABELS[rows]: r.ravel(), LABELS[columns]: c.ravel(), "Price": prices.ravel()})
+            st.altair_chart(alt.Chart(cells).mark_rect().encode(
+                x=alt.X(f"{LABELS[columns]}:O"),
+                y=alt.Y(f"{LABELS[rows]}:O", sort="descending"),
+                color=alt.Color("Price:Q", scale=alt.Scale(scheme="viridis")),
+                tooltip=[LABELS[rows], LABELS[columns], alt.Tooltip("Price:Q", format="$,.0f")],
+            ))
+
+        curve_feature = st.selectbox("Price curve", FEATURES, index=FEATURES.index("livingarea"), format_func=LABELS.get)
+        values, at_inputs = grid.curve(curve_feature)
+        _, averaged = grid.partial_dependence(curve_feature)
+        st.line_chart(pd.DataFrame({"At current inputs": at_inputs, "Partial dependence (grid average)": averaged},
+                                   index=pd.Index(values, name=LABELS[curve_feature])))
+
+
+# ------------------- Batch Prediction -----------------------
+with st.expander("📦 Batch Prediction (CSV upload)"):
+    st.write("Upload a CSV with columns: bedrooms, bathrooms, livingarea, condition, numberofschools, zip_code.")
+    uploaded = st.file_uploader("Properties CSV", type="csv", key="batch_upload")
+    if uploaded is not None and st.button("Score CSV", key="batch_submit"):
+        try:
+            # The download button keeps its own copy of the bytes, so the file can go right away
+            with tempfile.TemporaryDirectory() as tmp:
+                output_path = os.path.join(tmp, "predictions.csv")
+                rows = batch_predict.predict_csv(engine, uploaded, output_path)
+                st.success(f"Scored {rows:,} properties.")
+                with open(output_path, "rb") as f:
+                    st.download_button("Download results", f, file_name="predictions.csv", mime="text/csv")
+        except Exception as e:
+            st.error(f"Batch prediction failed: {str(e)}")
+
+
 # ------------------- Prediction History -----------------------
 st.subheader("📜 Prediction History")
-if st.session_state.history:
-    st.table(pd.DataFrame(st.session_state.history))
+history = st.session_state.history
+if len(history):
+    # Only the selected page is formatted and rendered
+    pages = history.page_count()
+    # Jump to the last page (newest rows) whenever a prediction has been added
+    if st.session_state.get("history_seen_total") != history.total:
+        st.session_state.history_seen_total = history.total
+        st.session_state.history_page = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key="history_page") if pages > 1 else 1
+    st.table(history.display_page(page - 1))
+    if history.total > len(history):
+        st.caption(f"Showing the last {len(history):,} of {history.total:,} predictions.")
+
+    # Exports are generated only when a download button is clicked
+    export_columns = st.columns(2)
+    export_columns[0].download_button("Download CSV", history.to_csv, file_name="prediction_history.csv", mime="text/csv")
+    if PARQUET_AVAILABLE:
+        export_columns[1].download_button("Download Parquet", history.to_parquet, file_name="prediction_history.parquet",
+                                          mime="application/octet-stream")
 else:
     st.write("No predictions yet.")
 
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.tree import DecisionTreeRegressor
+
+from model_kernel import NumpyModel, check_parity, export_model, sample_features
+
+
+# Every model type the notebook and train.py produce must predict the same
+# through the exported NumPy kernel as through scikit-learn.
+
+def _training_data():
+    X = sample_features(500, seed=1)
+    rng = np.random.default_rng(2)
+    y = 50000 + 20000 * X[:, 0] + 15000 * X[:, 1] + 150 * X[:, 2] + 10000 * X[:, 3] + rng.normal(0, 20000, len(X))
+    return X, y
+
+
+def _linear_1d(X, y):
+    return LinearRegression().fit(X, y)
+
+
+def _linear_2d(X, y):
+    return LinearRegression().fit(X, y.reshape(-1, 1))
+
+
+def _tree(X, y):
+    return DecisionTreeRegressor(max_depth=12, random_state=0).fit(X, y)
+
+
+def _forest(X, y):
+    return RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0).fit(X, y)
+
+
+def _grid_search_forest(X, y):
+    grid = {"n_estimators": [5, 10], "max_depth": [4, 8]}
+    return GridSearchCV(RandomForestRegressor(random_state=0), grid, cv=3).fit(X, y)
+
+
+@pytest.mark.parametrize("fit", [_linear_1d, _linear_2d, _tree, _forest, _grid_search_forest],
+                         ids=["linear-1d", "linear-2d", "tree", "forest", "grid-search-forest"])
+def test_exported_model_matches_sklearn(fit, tmp_path):
+    X, y = _training_data()
+    estimator = fit(X, y)
+    path = str(tmp_path / "model.npz")
+    export_model(estimator, path)
+    kernel = NumpyModel.load(path)
+
+    X_test = sample_features(2000, seed=3)
+    ok, max_diff = check_parity(estimator, kernel, X_test)
+    assert ok, f"max difference {max_diff}"
+    assert kernel.predict(X_test).shape == np.shape(estimator.predict(X_test))
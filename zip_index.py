@@ -0,0 +1,98 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+
+# Offline ZIP -> (lat, lon, state) table.
+# The index is a dense array with one row per possible 5-digit ZIP (00000-99999),
+# so a lookup is a single array access. It is memory-mapped from disk and loaded
+# lazily, once per process.
+
+ZIP_INDEX_PATH = os.environ.get(
+    "ZIP_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "zip_index.npy")
+)
+
+ZIP_SLOTS = 100000
+
+logger = logging.getLogger(__name__)
+
+ZIP_INDEX_DTYPE = np.dtype([("lat", "<f4"), ("lon", "<f4"), ("state", "u1")])
+
+# State codes stored in the index. Code 0 means "no entry for this ZIP".
+STATE_ABBREVIATIONS = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
+    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
+    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+    'DC': 'District of Columbia', 'PR': 'Puerto Rico', 'VI': 'Virgin Islands', 'GU': 'Guam',
+    'AS': 'American Samoa', 'MP': 'Northern Mariana Islands',
+}
+
+STATE_NAMES = ('Unknown',) + tuple(STATE_ABBREVIATIONS.values())
+STATE_CODES = {name: code for code, name in enumerate(STATE_NAMES)}
+
+
+def state_code(state):
+    # Accepts either a two-letter abbreviation or a full state name
+    state = str(state).strip()
+    name = STATE_ABBREVIATIONS.get(state.upper(), state)
+    return STATE_CODES.get(name, 0)
+
+
+class ZipIndex:
+    def __init__(self, table):
+        if table.dtype != ZIP_INDEX_DTYPE or table.shape != (ZIP_SLOTS,):
+            raise ValueError("ZIP index has an unexpected layout")
+        self.table = table
+
+    @classmethod
+    def load(cls, path=ZIP_INDEX_PATH):
+        return cls(np.load(path, mmap_mode="r"))
+
+    def lookup(self, zip_code):
+        # Returns (lat, lon, state) or None when the ZIP is not in the index
+        row = self.table[int(zip_code)]
+        if row["state"] == 0:
+            return None
+        return float(row["lat"]), float(row["lon"]), STATE_NAMES[row["state"]]
+
+    def __contains__(self, zip_code):
+        return self.table["state"][int(zip_code)] != 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self.table["state"]))
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_zip_index():
+    # Lazily load the shared index. Returns None if no index file has been built.
+    global _index, _index_loaded
+    if not _index_loaded:
+        with _index_lock:
+            if not _index_loaded:
+                if os.path.exists(ZIP_INDEX_PATH):
+                    _index = ZipIndex.load(ZIP_INDEX_PATH)
+                else:
+                    logger.warning("No ZIP index at %s; every new ZIP will be geocoded with Nominatim "
+                                   "(build one with build_zip_index.py)", ZIP_INDEX_PATH)
+                _index_loaded = True
+    return _index
+
+
+def lookup_zip(zip_code):
+    index = get_zip_index()
+    if index is None:
+        return None
+    return index.lookup(zip_code)